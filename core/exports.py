@@ -62,7 +62,7 @@ def fncExportSingleModule(module_name: str, data: dict, formats: set, root: path
             if key == "summary":
                 continue
             if isinstance(val, list) and val and isinstance(val[0], dict):
-                fncExportCSV(str(out_dir / f"{module_name}_{key}.csv"), val)
+                fncExportCSV(str(out_dir / f"{module_name}_{key}.csv"), val, fast=True)
 
     if "html" in formats:
         fncWriteHTMLReport(str(out_dir / f"{module_name}.html"), module_name, data)
@@ -88,7 +88,7 @@ def fncExportMultiModule(results: dict, formats: set, root: pathlib.Path):
                 if key == "summary":
                     continue
                 if isinstance(val, list) and val and isinstance(val[0], dict):
-                    fncExportCSV(str(mod_dir / f"{mod}_{key}.csv"), val)
+                    fncExportCSV(str(mod_dir / f"{mod}_{key}.csv"), val, fast=True)
 
     if "html" in formats:
         fncWriteHTMLReportMulti(str(out_dir / "CloudPoodle_Report.html"), results)
@@ -7,10 +7,47 @@
 # ================================================================
 
 import os, html, datetime, re, json
-from typing import Dict, Any, List, Tuple
+from typing import IO, Dict, Any, List, Tuple
 from core.utils import fncPrintMessage
 from handlers.logos import _logo_entra, _logo_aws, _logo_gcp, _logo_oracle
 
+# Optional: orjson for the per-cell JSON (details blobs) — same output shape
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+# Optional: rjsmin for module JS minification (fallback is line-based)
+try:
+    import rjsmin
+except Exception:  # pragma: no cover
+    rjsmin = None
+
+
+HTML_WRITE_BUFFER = 1 << 20   # 1 MiB: reports are multi-MB single writes
+
+# ---------- asset minifiers (modules run these once, at import) ----------
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE   = re.compile(r"\s+")
+_CSS_PUNCT_RE   = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON_RE   = re.compile(r":\s+")  # only after ':'; a space before it is a descendant combinator
+_JS_COMMENT_RE  = re.compile(r"^\s*(?://[^\n]*|/\*.*?\*/)\s*$", re.M | re.S)
+
+def fncMinifyCSS(css: str) -> str:
+    """Drop comments and collapse whitespace in module CSS."""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css)
+    return _CSS_COLON_RE.sub(":", css).strip()
+
+def fncMinifyJS(js: str) -> str:
+    """rjsmin when installed; otherwise strip whole-line comments and indentation."""
+    if rjsmin is not None:
+        return rjsmin.jsmin(js)
+    # Newlines stay so automatic semicolon insertion is unaffected
+    js = _JS_COMMENT_RE.sub("", js)
+    return "\n".join(line.strip() for line in js.splitlines() if line.strip())
 
 # ---------- tiny helpers ----------
 
@@ -20,10 +57,22 @@ def _esc(v: Any) -> str:
 def _slug(name: str) -> str:
     return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
 
+def _json_dumps(obj: Any, pretty: bool = False) -> str:
+    """json.dumps(ensure_ascii=False), compact or indent=2; orjson when available."""
+    if orjson is not None:
+        try:
+            opt = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+            return orjson.dumps(obj, option=opt).decode("utf-8")
+        except TypeError:  # unsupported type / oversized int -> stdlib path
+            pass
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
 def _fmt_cell(val: Any) -> str:
     if isinstance(val, (dict, list)):
         try:
-            s = json.dumps(val, separators=(",", ":"), ensure_ascii=False)
+            s = _json_dumps(val)
             if len(s) > 220:
                 s = s[:200] + " … +" + str(len(s) - 200) + " chars"
             return s
@@ -54,7 +103,7 @@ def _json_parse_maybe(val: Any) -> Tuple[bool, Any]:
         s = val.strip()
         if s.startswith("{") or s.startswith("["):
             try:
-                return True, json.loads(s)
+                return True, (orjson.loads(s) if orjson is not None else json.loads(s))
             except Exception:
                 return False, None
     return False, None
@@ -62,7 +111,7 @@ def _json_parse_maybe(val: Any) -> Tuple[bool, Any]:
 def _json_summary(parsed: Any, limit: int = 180) -> str:
     """Compact one-line summary of JSON for the <summary> text."""
     try:
-        compact = json.dumps(parsed, ensure_ascii=False, separators=(",", ":"))
+        compact = _json_dumps(parsed)
         return (compact[:limit] + " … +" + str(len(compact) - limit) + " chars") if len(compact) > limit else compact
     except Exception:
         return str(parsed)
@@ -77,7 +126,7 @@ def _cell_html(val: Any) -> str:
     if is_json:
         summ = _json_summary(parsed)
         try:
-            pretty = json.dumps(parsed, ensure_ascii=False, indent=2)
+            pretty = _json_dumps(parsed, pretty=True)
         except Exception:
             pretty = str(parsed)
         return (
@@ -625,8 +674,13 @@ def _collect_module_assets(provider: str | None, data: Dict[str, Any]) -> tuple[
 # ================================================================
 # Single-module report
 # ================================================================
-def fncWriteHTMLReport(filename: str, module_name: str, data_dict: Dict[str, Any]) -> None:
-    fncPrintMessage(f"Generating HTML report: {filename}", "info")
+def fncWriteHTMLReport(filename: str | IO[str], module_name: str, data_dict: Dict[str, Any]) -> None:
+    """
+    filename may be a path or an already-open text stream (the caller then
+    owns buffering/closing); paths are written through a 1 MiB buffer.
+    """
+    target = getattr(filename, "name", "<stream>") if hasattr(filename, "write") else filename
+    fncPrintMessage(f"Generating HTML report: {target}", "info")
     provider = (data_dict or {}).get("provider", "entra")
 
     css, js, container_class, expose_snippet = _collect_module_assets(provider, data_dict)
@@ -691,10 +745,13 @@ def fncWriteHTMLReport(filename: str, module_name: str, data_dict: Dict[str, Any
 {f"<script>{js}</script>" if js else ""}
 </body></html>"""
 
-    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(html_doc)
-    fncPrintMessage(f"HTML report written to {filename}", "success")
+    if hasattr(filename, "write"):
+        filename.write(html_doc)
+    else:
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, "w", encoding="utf-8", buffering=HTML_WRITE_BUFFER) as f:
+            f.write(html_doc)
+    fncPrintMessage(f"HTML report written to {target}", "success")
 
 
 # ================================================================
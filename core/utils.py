@@ -8,10 +8,11 @@ import os
 import json
 import csv
 import time
-import uuid
+import itertools
+import secrets
 import pathlib
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 DEBUG_ENABLED = False
 
@@ -27,6 +28,11 @@ except Exception:  # pragma: no cover
     class _Style(_Dummy): ...
     Fore, Style = _Fore(), _Dummy()
 
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
 try:
     from tabulate import tabulate
 except Exception:  # pragma: no cover
@@ -52,27 +58,32 @@ def fncSetDebug(enabled: bool) -> None:
 # ================================================================
 # Function: fncPrintMessage
 # Purpose : Standardised console output with levels and colours
-# Notes   : Levels: info, warn, error, success, debug; witty by design
-# ================================================================
-def fncPrintMessage(message: str, level: str = "info") -> None:
+# Notes   : Levels: info, warn, error, success, debug; witty by design.
+#           Extra args are %-formatted lazily, i.e. only when the level
+#           is actually printed (keeps debug calls cheap on hot paths).
+# ================================================================
+_MSG_COLOURS = {
+    "info": Fore.CYAN,
+    "warn": Fore.YELLOW,
+    "error": Fore.RED,
+    "success": Fore.GREEN,
+    "debug": Fore.MAGENTA
+}
+_MSG_PREFIX = {
+    "info": "[•]",
+    "warn": "[!]",
+    "error": "[✗]",
+    "success": "[✓]",
+    "debug": "[∆]"
+}
+
+def fncPrintMessage(message: str, level: str = "info", *args: Any) -> None:
     if level == "debug" and not DEBUG_ENABLED:
         return
-    colours = {
-        "info": Fore.CYAN,
-        "warn": Fore.YELLOW,
-        "error": Fore.RED,
-        "success": Fore.GREEN,
-        "debug": Fore.MAGENTA
-    }
-    prefix = {
-        "info": "[•]",
-        "warn": "[!]",
-        "error": "[✗]",
-        "success": "[✓]",
-        "debug": "[∆]"
-    }
-    colour = colours.get(level, "")
-    mark = prefix.get(level, "[ ]")
+    if args:
+        message = message % args
+    colour = _MSG_COLOURS.get(level, "")
+    mark = _MSG_PREFIX.get(level, "[ ]")
     print(f"{colour}{mark} {message}{Style.RESET_ALL}")
 
 
@@ -212,22 +223,47 @@ def fncReadJSON(path: str, safe: bool = True) -> Dict[str, Any]:
 # ================================================================
 # Function: fncWriteJSON
 # Purpose : Write data to JSON with nice formatting
-# Notes   : Ensures parent folder exists; UTF-8; 2-space indent
+# Notes   : Ensures parent folder exists; UTF-8; 2-space indent.
+#           Uses orjson (one buffer, one write) when installed.
 # ================================================================
 def fncWriteJSON(path: str, data: Dict[str, Any]) -> None:
     p = pathlib.Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    with open(p, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        buf = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        with open(p, "wb", buffering=1 << 22) as f:
+            f.write(buf)
+    else:
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
     fncPrintMessage(f"Saved JSON → {p}", "success")
 
 
+# Fast-path cell for fncExportCSV: plain text/number cells need no quoting,
+# anything else returns None so the row goes through the csv module.
+def _csv_fast_cell(v: Any) -> Optional[str]:
+    if v is None:
+        return ""
+    t = type(v)
+    if t is str:
+        if "," in v or '"' in v or "\n" in v or "\r" in v:
+            return None
+        return v
+    if t is int or t is float or t is bool:
+        return str(v)
+    return None
+
+
 # ================================================================
 # Function: fncExportCSV -- Prob Move to Exports....
 # Purpose : Save list[dict] or list[list] to CSV
-# Notes   : If rows are dicts, headers are union of keys (sorted)
+# Notes   : If rows are dicts, headers are union of keys (sorted).
+#           fast=True writes pre-joined lines for rows whose cells need
+#           no quoting (IDs, GUIDs, timestamps); output is identical to
+#           csv.DictWriter, which takes over from the first row that
+#           does need quoting.
 # ================================================================
-def fncExportCSV(path: str, rows: Iterable[Any]) -> None:
+def fncExportCSV(path: str, rows: Iterable[Any], fast: bool = False) -> None:
     rows = list(rows)
     p = pathlib.Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
@@ -240,11 +276,32 @@ def fncExportCSV(path: str, rows: Iterable[Any]) -> None:
 
     if isinstance(rows[0], dict):
         headers = sorted({k for r in rows for k in r.keys()})
-        with open(p, "w", newline="", encoding="utf-8") as f:
+        # {**defaults, **r} fills gaps in one C-level merge instead of a .get() per cell
+        defaults = dict.fromkeys(headers, "")
+        with open(p, "w", newline="", encoding="utf-8", buffering=1 << 16) as f:
             w = csv.DictWriter(f, fieldnames=headers)
             w.writeheader()
-            for r in rows:
-                w.writerow({k: r.get(k, "") for k in headers})
+            start = 0
+            # Single-column rows are excluded: csv quotes a lone empty field
+            if fast and len(headers) > 1:
+                buf: List[str] = []
+                size = 0
+                for r in rows:
+                    r2 = {**defaults, **r}
+                    cells = [_csv_fast_cell(r2[h]) for h in headers]
+                    if None in cells:
+                        break
+                    line = ",".join(cells)
+                    buf.append(line)
+                    size += len(line)
+                    start += 1
+                    if size >= 1 << 16:
+                        f.write("\r\n".join(buf) + "\r\n")
+                        buf, size = [], 0
+                if buf:
+                    f.write("\r\n".join(buf) + "\r\n")
+            for r in rows[start:]:
+                w.writerow({**defaults, **r})
     else:
         with open(p, "w", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
@@ -267,19 +324,26 @@ def fncTimestamp(zulu: bool = False) -> str:
 # ================================================================
 # Function: fncChunkList
 # Purpose : Yield items in fixed-size chunks
-# Notes   : Useful for batch Graph calls or rate limiting
+# Notes   : Useful for batch Graph calls or rate limiting. Yields tuples
+#           straight off an iterator (no slice copies of the source).
 # ================================================================
-def fncChunkList(items: List[Any], size: int) -> Iterable[List[Any]]:
-    for i in range(0, len(items), size):
-        yield items[i:i + size]
+def fncChunkList(items: Iterable[Any], size: int) -> Iterable[Sequence[Any]]:
+    if hasattr(itertools, "batched"):  # Python 3.12+
+        yield from itertools.batched(items, size)
+        return
+    it = iter(items)
+    while batch := tuple(itertools.islice(it, size)):
+        yield batch
 
 
 # ================================================================
 # Function: fncRetry
 # Purpose : Simple retry wrapper with backoff
-# Notes   : backoff in seconds; returns fn result or raises
+# Notes   : backoff in seconds; returns fn result or raises.
+#           Positional/keyword args are forwarded to fn, so callers can
+#           pass a bound method directly instead of wrapping it in a lambda.
 # ================================================================
-def fncRetry(fn, attempts: int = 3, backoff: float = 1.5, exceptions: Tuple = (Exception,), *args, **kwargs):
+def fncRetry(fn, *args, attempts: int = 3, backoff: float = 1.5, exceptions: Tuple = (Exception,), **kwargs):
     last_ex: Optional[Exception] = None
     for attempt in range(1, attempts + 1):
         try:
@@ -312,6 +376,46 @@ def fncSafeGet(data: Dict[str, Any], path: str, default: Any = None) -> Any:
     return cur
 
 
+# ================================================================
+# Function: _table_cell
+# Purpose : Pre-format one cell to the string tabulate would print
+# Notes   : None -> "", floats use tabulate's default "g" format
+# ================================================================
+def _table_cell(v: Any) -> Any:
+    if v is None:
+        return ""
+    if isinstance(v, str):
+        return v
+    if isinstance(v, float):
+        return format(v, "g")
+    return str(v)
+
+
+# ================================================================
+# Function: _table_grid
+# Purpose : Normalise rows into (headers, list[list[str]])
+# Notes   : Cells are pre-cast once here so tabulate's per-cell
+#           coercion is a no-op; headers=None for list rows means
+#           "first row is the header" (same as tabulate)
+# ================================================================
+def _table_grid(rows: List[Any], headers: Optional[List[str]]):
+    if isinstance(rows[0], dict):
+        hdrs = headers or sorted({k for r in rows if isinstance(r, dict) for k in r.keys()})
+        defaults = dict.fromkeys(hdrs, "")
+        grid = []
+        for r in rows:
+            if isinstance(r, dict):
+                r2 = {**defaults, **r}
+                grid.append([_table_cell(r2[h]) for h in hdrs])
+            else:
+                grid.append([_table_cell(v) for v in r])
+        return hdrs, grid
+    grid = [[_table_cell(v) for v in r] for r in rows]
+    if headers:
+        return list(headers), grid
+    return grid[0], grid[1:]
+
+
 # ================================================================
 # Function: fncToTable
 # Purpose : Render rows as a table string
@@ -325,12 +429,8 @@ def fncToTable(rows: Iterable[Any], headers: Optional[List[str]] = None, max_row
     if not rows:
         return "(no data)"
 
-    if isinstance(rows[0], dict):
-        hdrs = headers or sorted({k for r in rows for k in r.keys()})
-        table_rows = [[r.get(h, "") for h in hdrs] for r in rows]
-        return tabulate(table_rows, headers=hdrs, tablefmt="github")
-    else:
-        return tabulate(rows, headers=(headers or "firstrow"), tablefmt="github")
+    hdrs, grid = _table_grid(rows, headers)
+    return tabulate(grid, headers=hdrs, tablefmt="github")
 
 
 # ================================================================
@@ -352,7 +452,7 @@ def fncMask(value: Optional[str], show: int = 4) -> str:
 # Notes   : Useful for correlating logs and outputs
 # ================================================================
 def fncNewRunId(prefix: str = "run") -> str:
-    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+    return f"{prefix}-{secrets.token_hex(4)}"
 
 
 # ================================================================
@@ -1,20 +1,79 @@
 # ================================================================
 # File     : client.py
 # Purpose  : Microsoft Graph API read-only client for Entra (Azure AD)
-# Notes    : Read-only: GET + pagination + retries. No destructive ops.
-#            - Auto-refresh token on 401
+# Notes    : Read-only: GET + pagination + retries. No destructive ops
+#            (POST is only used for $batch of GETs / query endpoints).
+#            - Auto-refresh token on 401; 429/5xx retried in a capped loop
 #            - Proactive refresh if token expires in <5 minutes
+#            - MSAL token cache persisted to ~/.cloudpoodle/token.cache
+#            - HTTP/2 via httpx when installed (CLOUDPOODLE_HTTP2=0 to
+#              force the requests/HTTP 1.1 session)
 # ================================================================
 
 import os
+import json
+import atexit
+import pathlib
+import threading
 import msal
 import requests
 import time
 import getpass
-from typing import Dict, Any, List, Optional
-from core.utils import fncPrintMessage, fncRetry
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from core.utils import fncPrintMessage, fncLoadEnv, fncChunkList
+
+# Optional deps: httpx (+ h2) gives us a multiplexed HTTP/2 session
+try:
+    import httpx
+    import h2  # noqa: F401  (required by httpx for http2=True)
+except Exception:  # pragma: no cover
+    httpx = None
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
 
 GRAPH_ROOT = "https://graph.microsoft.com/v1.0"
+HTTP_TIMEOUT = 60.0
+MAX_RETRIES = 5            # total attempts per call (429/5xx/transport errors)
+RETRY_BACKOFF = 1.5        # seconds, exponential: 1, 1.5, 2.25, ...
+TRANSIENT_STATUS = {500, 502, 503, 504}
+BATCH_MAX = 20             # Graph $batch limit per request
+TRANSPORT_ERRORS: Tuple = (requests.RequestException,) + ((httpx.TransportError,) if httpx else ())
+USE_HTTP2 = httpx is not None and fncLoadEnv("CLOUDPOODLE_HTTP2", "1") != "0"
+TOKEN_CACHE_PATH = pathlib.Path.home() / ".cloudpoodle" / "token.cache"
+
+
+def _load_token_cache(path: pathlib.Path = TOKEN_CACHE_PATH) -> msal.SerializableTokenCache:
+    """
+    Load the MSAL token cache from disk and persist it again on exit.
+    Lets short-lived runs (CI, --scan per module) reuse a still-valid token
+    instead of going back to login.microsoftonline.com every time.
+    """
+    cache = msal.SerializableTokenCache()
+    try:
+        if path.exists():
+            cache.deserialize(path.read_text(encoding="utf-8"))
+    except Exception as ex:
+        fncPrintMessage(f"Ignoring unreadable token cache '{path}': {ex}", "debug")
+
+    def _persist():
+        if not cache.has_state_changed:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Create owner-only before writing so the token never hits disk world-readable
+            fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(cache.serialize())
+            os.chmod(path, 0o600)
+        except Exception as ex:
+            fncPrintMessage(f"Could not persist token cache '{path}': {ex}", "debug")
+
+    atexit.register(_persist)
+    return cache
+
 
 class GraphClient:
     def __init__(
@@ -56,16 +115,21 @@ class GraphClient:
 
         fncPrintMessage("Initialising Microsoft Graph (read-only) client...", "info")
 
-        # MSAL ConfidentialClientApplication
+        # MSAL ConfidentialClientApplication (token cache shared across runs)
         self.app = msal.ConfidentialClientApplication(
             client_id=self.client_id,
             client_credential=self.client_secret,
             authority=self.authority,
+            token_cache=_load_token_cache(),
         )
 
-        # token/bookkeeping
+        # One keep-alive session for every Graph call (HTTP/2 when available)
+        self._session = self._new_session()
+
+        # token/bookkeeping (one lock: modules and their workers share this client)
         self.token: str = ""
         self._token_expires_on: int = 0  # epoch seconds
+        self._token_lock = threading.Lock()
         self._set_token(self._acquire_token())
 
         fncPrintMessage("GraphClient initialised (read-only).", "success")
@@ -95,119 +159,242 @@ class GraphClient:
             self._token_expires_on = 0
         if not self._token_expires_on:
             self._token_expires_on = int(time.time()) + int(msal_result.get("expires_in", 3600))
+        # Headers only change when the token does: build once, bind to the session
+        self._headers_cache = {
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        self._session.headers.update(self._headers_cache)
 
     def _ensure_fresh_token(self) -> None:
         """Proactively refresh token if it expires in <5 minutes."""
-        now = int(time.time())
-        if now >= (self._token_expires_on - 300):  # <5 minutes remaining
-            fncPrintMessage("Refreshing access token (nearing expiry)...", "debug")
-            self._set_token(self._acquire_token())
+        if int(time.time()) < (self._token_expires_on - 300):
+            return
+        with self._token_lock:
+            # Re-check: another thread may have refreshed while we waited
+            if int(time.time()) >= (self._token_expires_on - 300):  # <5 minutes remaining
+                fncPrintMessage("Refreshing access token (nearing expiry)...", "debug")
+                self._set_token(self._acquire_token())
+
+    def _refresh_rejected_token(self, response) -> None:
+        """
+        Refresh after a 401, unless another thread already replaced the token
+        the failed request was sent with.
+        """
+        sent = str(response.request.headers.get("Authorization") or "")
+        with self._token_lock:
+            if sent == f"Bearer {self.token}":
+                self._set_token(self._acquire_token())
 
     def _auth_headers(self) -> Dict[str, str]:
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-        }
+        return self._headers_cache
 
     # ---------- HTTP handling ----------
 
-    def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
-        status = response.status_code
+    def _new_session(self):
+        """httpx.Client(http2=True) when available, else a requests.Session."""
+        if USE_HTTP2:
+            fncPrintMessage("Using HTTP/2 session (httpx).", "debug")
+            return httpx.Client(http2=True, timeout=HTTP_TIMEOUT)
+        return requests.Session()
+
+    def _send(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, body: Optional[bytes] = None,
+              headers: Optional[Dict[str, str]] = None):
+        """
+        Issue one HTTP call on the shared session (auth headers are bound in
+        _set_token); `headers` adds per-call extras such as ConsistencyLevel.
+        """
+        if isinstance(self._session, requests.Session):
+            return self._session.request(method, url, params=params, data=body, headers=headers, timeout=HTTP_TIMEOUT)
+        return self._session.request(method, url, params=params, content=body, headers=headers)
+
+    def _send_retrying(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                       body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None):
+        """_send with bounded backoff on transport errors (DNS, reset, timeout)."""
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                return self._send(method, url, params=params, body=body, headers=headers)
+            except TRANSPORT_ERRORS as ex:
+                if attempt == MAX_RETRIES:
+                    fncPrintMessage(f"All {MAX_RETRIES} attempts failed: {ex}", "error")
+                    raise
+                sleep_for = RETRY_BACKOFF ** (attempt - 1)
+                fncPrintMessage(f"Attempt {attempt}/{MAX_RETRIES} failed: {ex}. Retrying in {sleep_for:.1f}s…", "warn")
+                time.sleep(sleep_for)
+
+    def _resend(self, response, headers: Optional[Dict[str, str]] = None):
+        """
+        Re-issue the request behind a response (works for requests and httpx
+        responses). Auth comes from the session, so a refreshed token is used;
+        per-call extras must be passed again via `headers`.
+        """
+        req = response.request
+        body = getattr(req, "body", None)
+        if body is None and not isinstance(req, requests.PreparedRequest):
+            body = req.content or None  # httpx.Request
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        return self._send_retrying(req.method, str(req.url), body=body, headers=headers)
+
+    @staticmethod
+    def _decode(response) -> Any:
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    @staticmethod
+    def _error_parts(response) -> Tuple[str, str]:
+        """(code, message) from a Graph error body; empty strings if absent."""
+        try:
+            err = (response.json() or {}).get("error") or {}
+        except Exception:
+            err = {}
+        return str(err.get("code") or ""), str(err.get("message") or "")
 
-        # Success
-        if status == 200:
-            return response.json()
+    def _handle_response(self, response, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Turn a Graph response into JSON. 429/5xx are retried (Retry-After
+        honoured) and an expired token is refreshed once, all in a loop
+        capped at MAX_RETRIES so a throttling storm cannot grow the stack.
+        """
+        refreshed = False
+        for attempt in range(1, MAX_RETRIES + 1):
+            status = response.status_code
+
+            # Success
+            if status == 200:
+                return self._decode(response)
+
+            if attempt == MAX_RETRIES:
+                break
 
-        # Rate limit
-        if status == 429:
-            retry_after = int(response.headers.get("Retry-After", 5))
-            fncPrintMessage(f"Rate limit hit. Sleeping for {retry_after}s...", "warn")
-            time.sleep(retry_after)
-            req = response.request
-            resp = requests.request(method=req.method, url=req.url, headers=self._auth_headers(), data=req.body)
-            return self._handle_response(resp)
+            # Rate limit / transient server errors
+            if status == 429 or status in TRANSIENT_STATUS:
+                try:
+                    retry_after = float(response.headers.get("Retry-After"))
+                except (TypeError, ValueError):
+                    retry_after = 5.0 if status == 429 else RETRY_BACKOFF ** (attempt - 1)
+                label = "Rate limit hit" if status == 429 else f"Graph API transient error [{status}]"
+                fncPrintMessage(f"{label}. Sleeping for {retry_after:g}s...", "warn")
+                time.sleep(retry_after)
+                response = self._resend(response, headers)
+                continue
+
+            # Unauthorized (refresh and retry once)
+            if status == 401 and not refreshed:
+                code, msg = self._error_parts(response)
+                if "InvalidAuthenticationToken" in code or "expired" in msg.lower():
+                    fncPrintMessage("Access token expired — refreshing and retrying once...", "warn")
+                    self._refresh_rejected_token(response)
+                    refreshed = True
+                    response = self._resend(response, headers)
+                    continue
+            break
 
-        # Unauthorized (refresh and retry once)
+        status = response.status_code
         if status == 401:
-            try:
-                body = response.json()
-            except Exception:
-                body = {}
-            err = (body.get("error") or {})
-            code = err.get("code") or ""
-            msg = err.get("message") or ""
-            if "InvalidAuthenticationToken" in code or "expired" in str(msg).lower():
-                fncPrintMessage("Access token expired — refreshing and retrying once...", "warn")
-                self._set_token(self._acquire_token())
-                req = response.request
-                resp = requests.request(method=req.method, url=req.url, headers=self._auth_headers(), data=req.body)
-                if resp.status_code == 200:
-                    return resp.json()
-                # fall through to generic error handling below if still failing
             fncPrintMessage(f"Unauthorized (401): {response.text}", "error")
             raise Exception("Graph API request failed with status 401")
 
-        # Other client/server errors
+        # Other client/server errors (keep Graph's message so callers can react to it)
         if status >= 400:
             fncPrintMessage(f"Graph API Error [{status}] -> {response.text}", "error")
-            raise Exception(f"Graph API request failed with status {status}")
+            _, msg = self._error_parts(response)
+            raise Exception(f"Graph API request failed with status {status}" + (f": {msg}" if msg else ""))
 
         # Fallback
         try:
-            return response.json()
+            return self._decode(response)
         except Exception:
             return {"status": status, "text": response.text}
 
-    def _request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Single HTTP request with proactive token refresh and 401 auto-refresh retry."""
+    def _execute(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                 body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Single Graph call: proactive token refresh, then bounded retry/refresh handling."""
         self._ensure_fresh_token()
-        resp = requests.request(method, url, headers=self._auth_headers(), params=params)
-        return self._handle_response(resp)
+        resp = self._send_retrying(method, url, params=params, body=body, headers=headers)
+        return self._handle_response(resp, headers)
+
+    @staticmethod
+    def _url(endpoint: str) -> str:
+        """Graph URL for a relative endpoint; absolute URLs (nextLinks, /beta) pass through."""
+        endpoint = endpoint.strip()
+        if endpoint.startswith(("https://", "http://")):
+            return endpoint
+        return f"{GRAPH_ROOT}/{endpoint.lstrip('/')}"
 
     # ---------- Public API ----------
 
-    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
         Perform a GET request to a Graph endpoint (single page).
         Use get_all for paginated resources.
         """
-        url = f"{GRAPH_ROOT}/{endpoint.strip().lstrip('/')}"
-        fncPrintMessage(f"GET {url}", "debug")
-        return fncRetry(lambda: self._request("GET", url, params=params))
+        url = self._url(endpoint)
+        fncPrintMessage("GET %s", "debug", url)
+        return self._execute("GET", url, params=params, headers=headers)
 
-    def get_all(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def iter_all(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
         """
-        Retrieve all items from a paginated Graph endpoint.
-        Returns a flat list of items (value) for list endpoints.
-        Example: client.get_all("applications?$select=id,displayName")
+        Stream items from a paginated Graph endpoint, one page in memory at a
+        time. Non-list responses (no "value") yield the object itself.
+        Example: for app in client.iter_all("applications"): ...
         """
-        url = f"{GRAPH_ROOT}/{endpoint.strip().lstrip('/')}"
-        fncPrintMessage(f"GET (all pages) {url}", "debug")
-
-        def _single_page(req_url):
-            return self._request("GET", req_url, params=params)
+        url = self._url(endpoint)
+        fncPrintMessage("GET (all pages) %s", "debug", url)
 
-        data = fncRetry(lambda: _single_page(url))
-        items: List[Dict[str, Any]] = []
+        data = self._execute("GET", url, params=params, headers=headers)
 
-        if isinstance(data, dict) and "value" not in data:
-            return [data]
+        if not isinstance(data, dict):
+            return
+        if "value" not in data:
+            yield data
+            return
 
-        if isinstance(data, dict) and "value" in data:
-            items.extend(data.get("value", []))
-            next_link = data.get("@odata.nextLink")
-        else:
-            return items
+        yield from data.get("value", [])
+        next_link = data.get("@odata.nextLink")
 
         while next_link:
-            fncPrintMessage(f"Following nextLink -> {next_link}", "debug")
+            fncPrintMessage("Following nextLink -> %s", "debug", next_link)
 
-            page = fncRetry(lambda: self._request("GET", next_link))
-            if isinstance(page, dict):
-                items.extend(page.get("value", []))
-                next_link = page.get("@odata.nextLink")
-            else:
+            page = self._execute("GET", next_link, headers=headers)
+            if not isinstance(page, dict):
                 break
+            yield from page.get("value", [])
+            next_link = page.get("@odata.nextLink")
 
-        return items
+    def get_all(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                headers: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve all items from a paginated Graph endpoint.
+        Returns a flat list of items (value) for list endpoints.
+        Example: client.get_all("applications?$select=id,displayName")
+        """
+        return list(self.iter_all(endpoint, params=params, headers=headers))
+
+    def post_json(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a JSON body and return the parsed response. Only for read-style
+        endpoints ($batch of GETs, reporting queries) — never for writes.
+        """
+        url = self._url(endpoint)
+        payload = orjson.dumps(body) if orjson is not None else json.dumps(body).encode("utf-8")
+        fncPrintMessage("POST %s", "debug", url)
+        return self._execute("POST", url, body=payload)
+
+    def batch(self, requests_: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Send sub-requests through Graph JSON batching ($batch, max 20 per call).
+        Each request is {"id", "method", "url"} with url relative to the API
+        version root (e.g. "/applications?$select=id"). Returns the
+        sub-responses keyed by id: {"status", "headers", "body"}.
+        """
+        out: Dict[str, Dict[str, Any]] = {}
+        for chunk in fncChunkList(requests_, BATCH_MAX):
+            data = self.post_json("$batch", {"requests": list(chunk)})
+            for r in data.get("responses", []) or []:
+                out[str(r.get("id"))] = r
+        return out
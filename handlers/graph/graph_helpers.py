@@ -8,34 +8,35 @@ import re
 from typing import List, Dict, Any, Tuple
 from core.utils import fncPrintMessage
 
+_MISSING_PROP_RE = re.compile(r"Could not find a property named '([^']+)'")
+
 def safe_select_get_all(client, base_endpoint: str, fields: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
     """
     Calls client.get_all with a $select list. If Graph returns 400 with
-    "Could not find a property named 'X'", we warn, drop X, retry once,
+    "Could not find a property named 'X'", we warn, drop X, retry,
     and add X = "Not Found" to every returned row.
     Returns: (items, missing_fields)
     """
-    endpoint = f"{base_endpoint}?$select={','.join(fields)}" if fields else base_endpoint
-    try:
-        items = client.get_all(endpoint)
-        # ensure explicit keys exist
-        for it in items:
-            for f in fields:
-                it.setdefault(f, it.get(f, None))
-        return items, []
-    except Exception as ex:
-        msg = str(ex)
-        m = re.search(r"Could not find a property named '([^']+)'", msg)
-        if not m:
-            raise  # different error; bubble up
+    current_fields = list(fields)
+    missing: List[str] = []
+    while True:
+        endpoint = f"{base_endpoint}?$select={','.join(current_fields)}" if current_fields else base_endpoint
+        try:
+            items = client.get_all(endpoint)
+            break
+        except Exception as ex:
+            m = _MISSING_PROP_RE.search(str(ex))
+            if not m or m.group(1) not in current_fields:
+                raise  # different error; bubble up
+            bad = m.group(1)
+            fncPrintMessage(f"Property not found: '{bad}' — retrying without it.", "warn")
+            current_fields.remove(bad)
+            missing.append(bad)
 
-        missing = m.group(1)
-        if missing in fields:
-            fncPrintMessage(f"Property not found: '{missing}' — retrying without it.", "warn")
-            retry_fields = [f for f in fields if f != missing]
-            items, more_missing = safe_select_get_all(client, base_endpoint, retry_fields)
-            # add placeholder for the missing field
-            for it in items:
-                it[missing] = "Not Found"
-            return items, [missing] + more_missing
-        raise
+    # ensure explicit keys exist; placeholders for anything Graph rejected
+    for it in items:
+        for f in current_fields:
+            it.setdefault(f, None)
+        for f in missing:
+            it[f] = "Not Found"
+    return items, missing
@@ -5,6 +5,12 @@
 # Notes    : Updated for CloudPoodle dashboard (KPIs, standouts, charts)
 # ================================================================
 
+import os
+import sys
+import bisect
+import functools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Tuple
 from colorama import Fore, Style
@@ -16,6 +22,12 @@ from core.utils import (
 )
 from core.reporting import fncWriteHTMLReport
 
+# Optional: ciso8601 is a C ISO-8601 parser that takes Graph's "Z" suffix as-is
+try:
+    from ciso8601 import parse_datetime as _iso_parse
+except Exception:  # pragma: no cover
+    _iso_parse = None
+
 REQUIRED_PERMS = ["Directory.Read.All", "Application.Read.All"]
 
 # ----------------------- Module-local CSS/JS ---------------------
@@ -114,152 +126,231 @@ APP_CREDS_JS = r"""
 # Helper Functions
 # ================================================================
 
-def _parse_dt(val):
-    if not val:
-        return None
+def _parse_dt_str_impl(val: str):
+    """Parse one ISO-8601 string to an aware UTC datetime (None if unparseable)."""
     try:
-        if isinstance(val, datetime):
-            return val if val.tzinfo else val.replace(tzinfo=timezone.utc)
-        s = str(val).rstrip("Z")
-        dt = datetime.fromisoformat(s)
+        # Graph's usual shape "YYYY-MM-DDTHH:MM:SSZ": slice it, no string rebuilds
+        if len(val) == 20 and val[10] == "T" and val[19] == "Z":
+            if _iso_parse is not None:
+                return _iso_parse(val)
+            return datetime(int(val[0:4]), int(val[5:7]), int(val[8:10]),
+                            int(val[11:13]), int(val[14:16]), int(val[17:19]), tzinfo=timezone.utc)
+        if _iso_parse is not None:
+            dt = _iso_parse(val)
+        else:
+            dt = datetime.fromisoformat(val.rstrip("Z"))
         return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
     except Exception:
         return None
 
-def _days_left(end):
-    if not end:
+# Bulk-created secrets/cert rotations share expiry strings; datetimes are immutable
+_parse_dt_str = functools.lru_cache(maxsize=8192)(_parse_dt_str_impl)
+
+def _parse_dt(val):
+    if not val:
         return None
-    now = datetime.now(timezone.utc)
-    delta = end - now
-    return int(delta.days)
+    if isinstance(val, datetime):
+        return val if val.tzinfo else val.replace(tzinfo=timezone.utc)
+    return _parse_dt_str(val if type(val) is str else str(val))
+
+# Bucket upper bounds (exclusive, on days+1): <0, ≤10, ≤30, ≤60, ≤90, else
+_BUCKET_THRESH = [0, 11, 31, 61, 91]
+_BUCKET_NAMES = ["expired", "critical", "warning", "≤60d", "≤90d", ">90d"]
 
 def _bucket(days):
     if days is None:
         return "unknown"
-    if days < 0:
-        return "expired"
-    if days <= 10:
-        return "critical"
-    if days <= 30:
-        return "warning"
-    if days <= 60:
-        return "≤60d"
-    if days <= 90:
-        return "≤90d"
-    return ">90d"
+    return _BUCKET_NAMES[bisect.bisect_left(_BUCKET_THRESH, days + 1)]
+
+def _classify(end_raw, now: datetime) -> Tuple[int | None, str]:
+    """Parse `end_raw` and return (whole days from `now`, bucket) for a credential."""
+    end = _parse_dt_str(end_raw) if type(end_raw) is str and end_raw else _parse_dt(end_raw)
+    if end is None:
+        return None, "unknown"
+    days = (end - now).days
+    return days, _bucket(days)
+
+@functools.lru_cache(maxsize=4096)
+def _colour_days_int(d: int) -> str:
+    """ANSI-wrapped day count; cached since day values repeat heavily."""
+    if d < 0:   return f"{Fore.LIGHTBLACK_EX}{d}{Style.RESET_ALL}"
+    if d < 10:  return f"{Fore.RED}{d}{Style.RESET_ALL}"
+    if d < 30:  return f"{Fore.YELLOW}{d}{Style.RESET_ALL}"
+    return f"{Fore.WHITE}{d}{Style.RESET_ALL}"
+
+# Piped / CI output never renders ANSI codes: skip building them (honours NO_COLOR)
+_COLOR_ENABLED = sys.stdout.isatty() and os.environ.get("NO_COLOR") is None
+_paint_days = _colour_days_int if _COLOR_ENABLED else str
 
 def _colour_days(days):
-    """Return coloured string depending on days left."""
+    """Return coloured string depending on days left (plain when not a TTY)."""
     if days is None:
         return "-"
     try:
         d = int(days)
     except Exception:
         return str(days)
-    if d < 0:   return f"{Fore.LIGHTBLACK_EX}{d}{Style.RESET_ALL}"
-    if d < 10:  return f"{Fore.RED}{d}{Style.RESET_ALL}"
-    if d < 30:  return f"{Fore.YELLOW}{d}{Style.RESET_ALL}"
-    return f"{Fore.WHITE}{d}{Style.RESET_ALL}"
-
-def _flatten_creds(obj: Dict[str, Any], obj_type: str) -> List[Dict[str, Any]]:
-    rows = []
+    return _paint_days(d)
+
+class CredRow:
+    """One credential row. Slotted: large tenants produce 10^5 of these."""
+    __slots__ = ("objectType", "objectName", "appId", "objectId", "credential",
+                 "credDisplayName", "endDate", "daysRemaining", "bucket", "keyId")
+
+    def __init__(self, objectType, objectName, appId, objectId, credential,
+                 credDisplayName, endDate, daysRemaining, bucket, keyId):
+        self.objectType = objectType
+        self.objectName = objectName
+        self.appId = appId
+        self.objectId = objectId
+        self.credential = credential
+        self.credDisplayName = credDisplayName
+        self.endDate = endDate
+        self.daysRemaining = daysRemaining
+        self.bucket = bucket
+        self.keyId = keyId
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Plain dict for tables / JSON / HTML export."""
+        return {s: getattr(self, s) for s in CredRow.__slots__}
+
+def _flatten_creds(obj: Dict[str, Any], obj_type: str, now: datetime) -> List[CredRow]:
     name = obj.get("displayName") or obj.get("appDisplayName") or obj.get("appId") or obj.get("id")
-    obj_id = obj.get("id"); app_id = obj.get("appId")
-
-    for p in (obj.get("passwordCredentials") or []):
-        end = _parse_dt(p.get("endDateTime")); days = _days_left(end)
-        rows.append({
-            "objectType": obj_type,
-            "objectName": name,
-            "appId": app_id or "",
-            "objectId": obj_id,
-            "credential": "Secret",
-            "credDisplayName": p.get("displayName") or "",
-            "endDate": p.get("endDateTime") or "",
-            "daysRemaining": days,
-            "bucket": _bucket(days),
-            "keyId": p.get("keyId") or "",
-        })
-
-    for k in (obj.get("keyCredentials") or []):
-        end = _parse_dt(k.get("endDateTime")); days = _days_left(end)
-        rows.append({
-            "objectType": obj_type,
-            "objectName": name,
-            "appId": app_id or "",
-            "objectId": obj_id,
-            "credential": "Certificate",
-            "credDisplayName": k.get("displayName") or "",
-            "endDate": k.get("endDateTime") or "",
-            "daysRemaining": days,
-            "bucket": _bucket(days),
-            "keyId": k.get("keyId") or "",
-        })
-    return rows
-
-def _rows_for_console(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Return a version with colored days for terminal preview."""
+    obj_id = obj.get("id"); app_id = obj.get("appId") or ""
+
+    def _row(c: Dict[str, Any], kind: str) -> CredRow:
+        end_raw = c.get("endDateTime")
+        days, bucket = _classify(end_raw, now)
+        return CredRow(obj_type, name, app_id, obj_id, kind,
+                       c.get("displayName") or "", end_raw or "",
+                       days, bucket, c.get("keyId") or "")
+
+    pw_creds = [_row(p, "Secret") for p in (obj.get("passwordCredentials") or [])]
+    certs = [_row(k, "Certificate") for k in (obj.get("keyCredentials") or [])]
+    return pw_creds + certs
+
+def _rows_for_console(rows: List[CredRow]) -> List[Dict[str, Any]]:
+    """Return dicts with colored days for terminal preview."""
     out = []
     for r in rows:
-        r2 = dict(r)
-        r2["daysRemaining"] = _colour_days(r.get("daysRemaining"))
+        r2 = r.as_dict()
+        r2["daysRemaining"] = _colour_days(r.daysRemaining)
         out.append(r2)
     return out
 
-def _summarise(rows: List[Dict[str, Any]]):
-    total = len(rows)
-    counts = {"expired": 0, "critical": 0, "warning": 0, "≤60d": 0, "≤90d": 0, ">90d": 0, "unknown": 0}
-    for r in rows:
-        counts[r.get("bucket","unknown")] = counts.get(r.get("bucket","unknown"), 0) + 1
-    return {
-        "Total Credentials": total,
-        "Expired": counts["expired"],
-        "Critical (<10d)": counts["critical"],
-        "Warning (<30d)": counts["warning"],
-        "≤60 days": counts["≤60d"],
-        "≤90 days": counts["≤90d"],
-        ">90 days": counts[">90d"],
-        "Unknown": counts["unknown"],
-    }
+SUMMARY_KEYS = ("Total Credentials", "Expired", "Critical (<10d)", "Warning (<30d)",
+                "≤60 days", "≤90 days", ">90 days", "Unknown")
+_SUMMARY_BUCKETS = dict(zip(SUMMARY_KEYS[1:], ("expired", "critical", "warning", "≤60d", "≤90d", ">90d", "unknown")))
+
+def _summarise(rows: List[CredRow]):
+    counts = Counter(r.bucket for r in rows)  # missing buckets read as 0
+    out = {"Total Credentials": len(rows)}
+    out.update((k, counts[b]) for k, b in _SUMMARY_BUCKETS.items())
+    return out
 
-def _sort_days_key(r: Dict[str, Any]) -> Tuple[int, int]:
-    """Sort by bucket severity then days (Unknown at end). Lower is riskier."""
-    b_order = {"expired": 0, "critical": 1, "warning": 2, "≤60d": 3, "≤90d": 4, ">90d": 5, "unknown": 6}
-    bucket = r.get("bucket","unknown")
-    days = r.get("daysRemaining")
-    days_num = days if isinstance(days, int) else 99999
-    return (b_order.get(bucket, 6), days_num)
+def _summarise_merge(a: Dict[str, int], b: Dict[str, int]) -> Dict[str, int]:
+    """Add two _summarise() results key by key."""
+    return {k: a[k] + b[k] for k in SUMMARY_KEYS}
+
+_BUCKET_ORDER = {"expired": 0, "critical": 1, "warning": 2, "≤60d": 3, "≤90d": 4, ">90d": 5, "unknown": 6}
+
+def _sort_days_key(r: CredRow) -> Tuple[int, int]:
+    """Sort by bucket severity then raw int days (Unknown at end). Lower is riskier."""
+    days = r.daysRemaining
+    return (_BUCKET_ORDER.get(r.bucket, 6), 99999 if days is None else days)
 
 # --------- standouts helpers ----------
-def _pick_soonest(rows: List[Dict[str, Any]], kind: str) -> Dict[str, Any] | None:
-    cands = [r for r in rows if r.get("credential")==kind]
-    if not cands: return None
-    cands.sort(key=_sort_days_key)
-    r = cands[0]
-    # scale “risk score” 0..10 (expired/critical ~ high)
-    days = r.get("daysRemaining")
-    if days is None: score = 3.0
+def _standout(r: CredRow, title: str, name: str, unknown_score: float) -> Dict[str, Any]:
+    """Standout tile for one row; risk score scaled 0..10 (expired/critical ~ high)."""
+    days = r.daysRemaining
+    if days is None: score = unknown_score
     else:
         score = 10.0 if days < 0 else max(1.0, 10.0 - min(365, days)/36.5)
     return {
-        "title": f"Soonest Expiring {kind}",
-        "name": f"{r.get('objectName')}",
+        "title": title,
+        "name": name,
         "risk_score": float(round(score,2)),
-        "comment": f"{r.get('bucket').title()} — {days if days is not None else '?'} days left"
+        "comment": f"{r.bucket.title()} — {days if days is not None else '?'} days left"
     }
 
-def _highest_risk_object(rows: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+def _pick_soonest(rows: List[CredRow], kind: str) -> Dict[str, Any] | None:
+    # Only the riskiest row is needed: O(N) min, not a full sort
+    r = min((r for r in rows if r.credential == kind), key=_sort_days_key, default=None)
+    if r is None: return None
+    return _standout(r, f"Soonest Expiring {kind}", f"{r.objectName}", unknown_score=3.0)
+
+def _highest_risk_object(rows: List[CredRow]) -> Dict[str, Any] | None:
     if not rows: return None
-    rows2 = sorted(rows, key=_sort_days_key)
-    r = rows2[0]
-    days = r.get("daysRemaining")
-    score = 10.0 if days is None else (10.0 if days < 0 else max(1.0, 10.0 - min(365, days)/36.5))
-    return {
-        "title": "Highest Risk Object",
-        "name": f"{r.get('objectName')} ({r.get('credential')})",
-        "risk_score": float(round(score,2)),
-        "comment": f"{r.get('bucket').title()} — {days if days is not None else '?'} days left"
-    }
+    r = min(rows, key=_sort_days_key)
+    return _standout(r, "Highest Risk Object", f"{r.objectName} ({r.credential})", unknown_score=10.0)
+
+# $top=999 (Graph's max for these collections): nextLinks are a chain and can't
+# be fetched in parallel, so fewer, larger pages is what cuts the round trips
+_CRED_SELECT = "$select=id,displayName,appId,passwordCredentials,keyCredentials&$top=999"
+def _cred_queries(collection: str) -> List[Tuple[str, Dict[str, str] | None]]:
+    """(path, headers) in preference order: $select only, bare."""
+    return [
+        (f"{collection}?{_CRED_SELECT}", None),
+        (collection, None),
+    ]
+
+def _fetch_rows(client, queries: List[Tuple[str, Dict[str, str] | None]], label: str,
+                obj_type: str, now: datetime) -> List[CredRow]:
+    """
+    Stream objects page by page and flatten them as they arrive (raw Graph
+    objects are dropped straight away). Falls through `queries` when the
+    tenant rejects $select (schema variance, 400/501).
+    """
+    for i, (path, headers) in enumerate(queries):
+        try:
+            return [row for o in client.iter_all(path, headers=headers) for row in _flatten_creds(o, obj_type, now)]
+        except Exception:
+            if i == len(queries) - 1:
+                raise
+            fncPrintMessage(f"Retrying {label} with a simpler query (tenant schema variance).", "warn")
+    return []
+
+def _fetch_batched(client, now: datetime) -> Tuple[List[CredRow], List[CredRow]] | None:
+    """
+    First page of both collections in one $batch round trip, then stream
+    nextLinks per collection. A failed sub-request falls back to the
+    simpler queries for that collection only; returns None if the batch
+    itself fails so the caller can use the per-collection path.
+    """
+    if not hasattr(client, "batch"):
+        return None
+    collections = (("apps", "applications", "Application"),
+                   ("sps", "servicePrincipals", "ServicePrincipal"))
+    try:
+        resp = client.batch([
+            {"id": rid, "method": "GET", "url": "/" + _cred_queries(coll)[0][0]}
+            for rid, coll, _ in collections
+        ])
+    except Exception as ex:
+        fncPrintMessage(f"Batch fetch failed ({ex}); falling back to separate requests.", "debug")
+        return None
+
+    def _finish(rid: str, coll: str, obj_type: str) -> List[CredRow]:
+        # Any failure (sub-request or a nextLink page) re-runs this
+        # collection through the simpler queries
+        r = resp.get(rid) or {}
+        if r.get("status") == 200:
+            body = r.get("body") or {}
+            try:
+                rows = [row for o in (body.get("value") or []) for row in _flatten_creds(o, obj_type, now)]
+                if body.get("@odata.nextLink"):
+                    rows.extend(row for o in client.iter_all(body["@odata.nextLink"])
+                                for row in _flatten_creds(o, obj_type, now))
+                return rows
+            except Exception as ex:
+                fncPrintMessage(f"Paging {coll} failed ({ex}); retrying with a simpler query.", "warn")
+        return _fetch_rows(client, _cred_queries(coll)[1:], coll, obj_type, now)
+
+    # Drain both collections' nextLinks in parallel, as the unbatched path does
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        fut_apps, fut_sps = (executor.submit(_finish, rid, coll, obj_type)
+                             for rid, coll, obj_type in collections)
+        return fut_apps.result(), fut_sps.result()
 
 # ================================================================
 # Main Function
@@ -268,27 +359,24 @@ def run(client, args):
     run_id = fncNewRunId("appcreds")
     fncPrintMessage(f"Running App Credentials Expiry (run={run_id})", "info")
 
-    # Fetch applications
-    try:
-        apps = client.get_all("applications?$select=id,displayName,appId,passwordCredentials,keyCredentials")
-    except Exception:
-        fncPrintMessage("Retrying applications without $select (tenant schema variance).", "warn")
-        apps = client.get_all("applications")
-
-    # Fetch service principals
-    try:
-        sps = client.get_all("servicePrincipals?$select=id,displayName,appId,passwordCredentials,keyCredentials")
-    except Exception:
-        fncPrintMessage("Retrying service principals without $select (tenant schema variance).", "warn")
-        sps = client.get_all("servicePrincipals")
-
-    app_rows: List[Dict[str, Any]] = []
-    for a in apps:
-        app_rows.extend(_flatten_creds(a, "Application"))
+    # One reference time for the whole run (not one now() per credential)
+    now = datetime.now(timezone.utc)
 
-    sp_rows: List[Dict[str, Any]] = []
-    for s in sps:
-        sp_rows.extend(_flatten_creds(s, "ServicePrincipal"))
+    # Fetch + flatten applications / service principals: one $batch round
+    # trip, else in parallel, each falling back to simpler queries
+    fetched = _fetch_batched(client, now)
+    if fetched is not None:
+        app_rows, sp_rows = fetched
+    else:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            fut_apps = executor.submit(
+                _fetch_rows, client, _cred_queries("applications"), "applications", "Application", now,
+            )
+            fut_sps = executor.submit(
+                _fetch_rows, client, _cred_queries("servicePrincipals"), "service principals", "ServicePrincipal", now,
+            )
+            app_rows = fut_apps.result()
+            sp_rows = fut_sps.result()
 
     # Sort by severity then days asc
     app_rows.sort(key=_sort_days_key)
@@ -303,21 +391,15 @@ def run(client, args):
 
     # ----- Console preview -----
     fncPrintMessage("Applications — Credential Expiry Summary", "info")
-    print(fncToTable(
-        [{"Field": k, "Value": v} for k, v in app_summary.items()],
-        headers=["Field", "Value"], max_rows=9999
-    ))
+    print(fncToTable(list(app_summary.items()), headers=["Field", "Value"], max_rows=len(app_summary)))
 
     fncPrintMessage("Service Principals — Credential Expiry Summary", "info")
-    print(fncToTable(
-        [{"Field": k, "Value": v} for k, v in sp_summary.items()],
-        headers=["Field", "Value"], max_rows=9999
-    ))
+    print(fncToTable(list(sp_summary.items()), headers=["Field", "Value"], max_rows=len(sp_summary)))
 
     if app_rows:
         fncPrintMessage("Applications — Expiring/Expired (top 25)", "info")
         print(fncToTable(
-            _rows_for_console(app_rows)[:25],
+            _rows_for_console(app_rows[:25]),
             headers=["objectName","appId","credential","credDisplayName","endDate","daysRemaining","bucket"],
             max_rows=25
         ))
@@ -325,20 +407,14 @@ def run(client, args):
     if sp_rows:
         fncPrintMessage("Service Principals — Expiring/Expired (top 20)", "info")
         print(fncToTable(
-            _rows_for_console(sp_rows)[:20],
+            _rows_for_console(sp_rows[:20]),
             headers=["objectName","appId","credential","credDisplayName","endDate","daysRemaining","bucket"],
             max_rows=20
         ))
 
     # ---------- Dashboard metrics ----------
-    total_creds = app_summary["Total Credentials"] + sp_summary["Total Credentials"]
-    expired      = app_summary["Expired"] + sp_summary["Expired"]
-    critical     = app_summary["Critical (<10d)"] + sp_summary["Critical (<10d)"]
-    warning      = app_summary["Warning (<30d)"] + sp_summary["Warning (<30d)"]
-    le60         = app_summary["≤60 days"] + sp_summary["≤60 days"]
-    le90         = app_summary["≤90 days"] + sp_summary["≤90 days"]
-    gt90         = app_summary[">90 days"] + sp_summary[">90 days"]
-    unknown      = app_summary["Unknown"] + sp_summary["Unknown"]
+    summary = _summarise_merge(app_summary, sp_summary)
+    total_creds, expired, critical, warning, le60, le90, gt90, unknown = (summary[k] for k in SUMMARY_KEYS)
 
     # KPIs (appear at top)
     kpis = [
@@ -366,19 +442,10 @@ def run(client, args):
     data = {
         "provider": "entra",
         "run_id": run_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "summary": {
-            "Total Credentials": total_creds,
-            "Expired": expired,
-            "Critical (<10d)": critical,
-            "Warning (<30d)": warning,
-            "≤60 days": le60,
-            "≤90 days": le90,
-            ">90 days": gt90,
-            "Unknown": unknown,
-        },
-        "applications": app_rows,
-        "servicePrincipals": sp_rows,
+        "timestamp": now.isoformat(),
+        "summary": summary,
+        "applications": [r.as_dict() for r in app_rows],
+        "servicePrincipals": [r.as_dict() for r in sp_rows],
 
         # ===== Dashboard bits =====
         "_kpis": kpis,
@@ -0,0 +1,236 @@
+(function () {
+  const root = document.querySelector('.ca-audit') || document;
+
+  // Known table ids from reporting.py
+  const top = root.querySelector('#tbl-ca-policies');
+  const det = root.querySelector('#tbl-ca-policy-details');
+  if (top) top.setAttribute('data-key','ca_policies');
+  if (det) det.setAttribute('data-key','ca_policy_details');
+  if (!top) return;
+
+  // ---- helpers ----
+  const SLUG_RE = /[^a-z0-9]+/g;
+  const txt = el => (el?.textContent || '').trim();
+  const slug = s => (s||'').toLowerCase().replace(SLUG_RE,'-');
+  // Rows and header cells are collected once per table and passed to every helper
+  const rowsOf = t => Array.from(t?.tBodies[0]?.rows || []);
+  const headCellsOf = t => Array.from(t?.tHead?.rows[0]?.cells || []);
+  const hideColumn = (ths, rows, idx) => {
+    if (ths[idx]) ths[idx].classList.add('ca-hide');
+    rows.forEach(tr => { const c = tr.cells[idx]; if (c) c.classList.add('ca-hide'); });
+  };
+
+  function hideColumns(ths, rows, headers, keepSet) {
+    const HIDE_ALWAYS = new Set(['Id', 'Details']);
+    const idxByName = new Map();
+    headers.forEach((name,i)=>{
+      idxByName.set(name, i);
+      if (HIDE_ALWAYS.has(name) || !keepSet.has(name)) hideColumn(ths, rows, i);
+    });
+    return idxByName;
+  }
+
+  function buildDetailsMap(rows, headers){
+    const map = new Map();
+    rows.forEach(tr=>{
+      const tds = tr.cells;
+      if (!tds.length) return;
+      const id = txt(tds[0]);
+      const m = {};
+      headers.forEach((name, idx) => m[name] = tds[idx] || null);
+      map.set(id, m);
+    });
+    return map;
+  }
+
+  // Drawer skeleton is parsed once; each expand clones it and fills fields
+  let drawerTpl = null;
+  function drawerTemplate(){
+    if (drawerTpl) return drawerTpl;
+    drawerTpl = document.createElement('template');
+    drawerTpl.innerHTML = `<tr class="ca-expander"><td>
+      <div class="ca-expander-body">
+        <div class="ca-flex">
+          <div class="ca-pane">
+            <h5>Overview</h5>
+            <table class="ca-kv"><tbody>
+              <tr><th>Name</th><td data-field="name"></td></tr>
+              <tr><th>Id</th><td data-field="id"></td></tr>
+              <tr><th>State</th><td data-field="state"></td></tr>
+              <tr><th>Users/Groups</th><td data-field="users"></td></tr>
+              <tr><th>Apps</th><td data-field="apps"></td></tr>
+              <tr><th>Grant Controls</th><td data-field="grant"></td></tr>
+              <tr><th>Session</th><td data-field="sess"></td></tr>
+              <tr><th>Notes</th><td data-field="notes"></td></tr>
+            </tbody></table>
+          </div>
+          <div class="ca-pane">
+            <h5>Details</h5>
+            <table class="ca-kv"><tbody>
+              <tr><th>Full Object</th><td data-field="details"></td></tr>
+            </tbody></table>
+          </div>
+        </div>
+      </div>
+    </td></tr>`;
+    return drawerTpl;
+  }
+
+  function attachRowDrawer(table, rows, options){
+    const { idIdx, nameIdx, detailsById, isDetailsTable, headers } = options;
+    const totalCols = headers.length;
+    const tbody     = table.tBodies[0];
+    if (!tbody) return;
+
+    // One cheap pass to decorate names; clicks are handled by a single delegated listener
+    rows.forEach(tr=>{
+      const nameCell = nameIdx >= 0 ? tr.children[nameIdx] : tr.children[0];
+      if (!nameCell) return;
+
+      const label = txt(nameCell);
+      nameCell.innerHTML = `<span class="ca-name"><span class="ca-chevron">▸</span><span class="ca-label"></span></span>`;
+      nameCell.querySelector('.ca-label').textContent = label;
+
+      tr.classList.add('ca-clickable');
+    });
+
+    tbody.addEventListener('click', e=>{
+      const tr = e.target.closest('tr');
+      if (!tr || tr.parentNode !== tbody || !tr.classList.contains('ca-clickable')) return;
+
+      const idCell = idIdx >= 0 ? tr.children[idIdx] : null;
+      const label  = txt(tr.querySelector('.ca-label'));
+      const pid  = idCell ? txt(idCell) : (isDetailsTable ? txt(tr.children[0]) : '');
+      const open = tr.classList.contains('ca-open');
+      const next = tr.nextElementSibling;
+      if (next && next.classList.contains('ca-expander')) next.remove();
+      tr.classList.remove('ca-open');
+      if (open) return;
+
+      // Source cells (td elements) keyed by header name
+      let src = {};
+      if (isDetailsTable) {
+        const tds = tr.children;
+        headers.forEach((name, idx) => src[name] = tds[idx] || null);
+      } else {
+        src = detailsById.get(pid) || {};
+      }
+
+      const exp  = drawerTemplate().content.firstElementChild.cloneNode(true);
+      const set  = (field, text, fallback) => {
+        const el = exp.querySelector(`[data-field="${field}"]`);
+        if (text) el.textContent = text; else if (fallback) el.innerHTML = fallback;
+      };
+      exp.firstElementChild.colSpan = totalCols;
+      set('name',  label);
+      set('id',    pid, '<em>unknown</em>');
+      set('state', txt(src['State']));
+      set('users', txt(src['Users']));
+      set('apps',  txt(src['Apps']));
+      set('grant', txt(src['Grant']));
+      set('sess',  txt(src['Session']));
+      set('notes', txt(src['Notes']), '-');
+
+      // Only the JSON details keep their markup: clone the nodes, no re-parse
+      const detailsEl = exp.querySelector('[data-field="details"]');
+      if (src['Details'] && src['Details'].childNodes.length) {
+        detailsEl.replaceChildren(...Array.from(src['Details'].cloneNode(true).childNodes));
+      } else {
+        detailsEl.innerHTML = '<em>none available</em>';
+      }
+
+      tr.after(exp);
+      tr.classList.add('ca-open');
+
+      const chev = tr.querySelector('.ca-chevron');
+      if (chev) chev.textContent = '▾';
+    });
+  }
+
+  function addToolbar(table, title){
+    const card = table.closest('.card');
+    if (!card) return;
+    const bar = document.createElement('div');
+    bar.className = 'ca-toolbar';
+    bar.innerHTML = `
+      <input type="search" placeholder="Search ${title}…" aria-label="Search ${title}">
+      <button class="btn primary" data-action="viewmore" style="display:none">View more…</button>
+    `;
+    card.insertBefore(bar, card.querySelector('.tablewrap'));
+    return bar;
+  }
+
+  function paginateAndSearch(table, rows, toolbar){
+    const search = toolbar.querySelector('input[type="search"]');
+    const viewMoreBtn = toolbar.querySelector('[data-action="viewmore"]');
+    // Lowercase each row's text once; keystrokes then only do includes()
+    const hay  = rows.map(tr => tr.textContent.toLowerCase());
+    const PAGE = 20; let expanded = false;
+
+    function apply(){
+      const q = (search.value||'').toLowerCase();
+      // Decide first (no DOM reads/writes), then apply every toggle in one batch
+      const hide = new Array(rows.length);
+      let shown = 0;
+      for (let i = 0; i < rows.length; i++) {
+        hide[i] = (q && !hay[i].includes(q)) || (!expanded && q === '' && shown >= PAGE);
+        if (!hide[i]) shown++;
+      }
+      for (let i = 0; i < rows.length; i++) rows[i].classList.toggle('ca-hide', hide[i]);
+      const moreExists = shown < rows.length && q === '' && !expanded;
+      viewMoreBtn.style.display = moreExists ? '' : 'none';
+    }
+
+    // Coalesce bursts of keystrokes into one pass per frame
+    let pending = 0;
+    const schedule = () => { if (!pending) pending = requestAnimationFrame(()=>{ pending = 0; apply(); }); };
+
+    apply();
+    search.addEventListener('input', schedule);
+    viewMoreBtn.addEventListener('click', ()=>{ expanded = true; apply(); });
+  }
+
+  // ------------ Overview table (top) ------------
+  const keepTop = new Set(['Id','Name','State','Scope','Risk']);
+  const topThs  = headCellsOf(top);
+  const topRows = rowsOf(top);
+  const topHeaders = topThs.map(txt);
+  const idxTop  = hideColumns(topThs, topRows, topHeaders, keepTop);
+  // Details headers/rows are read once and shared by the map and the details drawer
+  const detThs  = headCellsOf(det);
+  const detRows = rowsOf(det);
+  const detHeaders = detThs.map(txt);
+  const detMap  = buildDetailsMap(detRows, detHeaders);
+  attachRowDrawer(top, topRows, {
+    idIdx: idxTop.has('Id') ? idxTop.get('Id') : -1,
+    nameIdx: idxTop.has('Name') ? idxTop.get('Name') : -1,
+    detailsById: detMap,
+    isDetailsTable: false,
+    headers: topHeaders
+  });
+  const barTop = addToolbar(top, 'CA Policies');
+  if (barTop) paginateAndSearch(top, topRows, barTop);
+
+  // ------------ Details table (det) ------------
+  if (det) {
+    const headers = detHeaders;
+    const idIdx   = headers.indexOf('Id');
+    const nameIdx = headers.indexOf('Name');
+
+    // Hide Id and Details columns in the grid (data remains for the drawer)
+    headers.forEach((name, idx)=>{
+      if (name === 'Id' || name === 'Details') hideColumn(detThs, detRows, idx);
+    });
+
+    attachRowDrawer(det, detRows, {
+      idIdx: idIdx >= 0 ? idIdx : 0,
+      nameIdx: nameIdx >= 0 ? nameIdx : 1,
+      detailsById: null,
+      isDetailsTable: true,
+      headers
+    });
+
+    const barDet = addToolbar(det, 'CA Policy Details');
+    if (barDet) paginateAndSearch(det, detRows, barDet);
+  }
+})();
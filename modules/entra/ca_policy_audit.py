@@ -8,8 +8,13 @@
 #            data["ca_policy_details"] (per-policy details)
 #            data["_kpis"], data["_standouts"], data["_charts"]
 #            data["_inline_css"] / "_inline_js" / "_container_class"
+#            (CSS/JS live in assets/ca_audit.css|js)
 # ================================================================
 
+import os
+import functools
+import pathlib
+from operator import itemgetter
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Tuple
 
@@ -18,295 +23,45 @@ from core.utils import (
     fncNewRunId,
     fncToTable,
 )
-from core.reporting import fncWriteHTMLReport
+from core.reporting import fncWriteHTMLReport, HTML_WRITE_BUFFER
+
+CONSOLE_TOP = 25   # console preview only; reports keep every policy
 
 REQUIRED_PERMS = [
     "Directory.Read.All",
     "Policy.Read.All",                # or Policy.Read.ConditionalAccess
 ]
 
-# ----------------------- module-local CSS ------------------------
-CA_AUDIT_CSS = r"""
-.ca-audit .ca-clickable { cursor: pointer; }
-.ca-audit .ca-clickable:hover { background: rgba(255,255,255,.05); }
-.ca-audit .ca-expander > td { padding: 0; background: #10141b; }
-.ca-audit .ca-expander-body { padding: 14px 16px; border-top: 1px solid rgba(255,255,255,.08); }
-
-/* Overview table: keep columns tight and only show selected ones */
-.ca-audit table[data-key="ca_policies"] th,
-.ca-audit table[data-key="ca_policies"] td { white-space: nowrap; }
-.ca-audit .ca-hide { display: none !important; }
-
-/* Chevron in Name cell */
-.ca-audit .ca-name { display:inline-flex; align-items:center; gap:8px; }
-.ca-audit .ca-chevron { display:inline-block; width:1em; transition: transform .15s ease; opacity:.85; }
-.ca-audit .ca-open .ca-chevron { transform: rotate(90deg); }
-
-/* Drawer layout */
-.ca-audit .ca-flex { display: grid; grid-template-columns: 1fr 1.2fr; gap: 16px; }
-@media (max-width: 1100px){ .ca-audit .ca-flex { grid-template-columns: 1fr; } }
-.ca-audit .ca-pane {
-  border: 1px solid var(--border);
-  border-radius: 10px;
-  background: color-mix(in srgb, var(--card) 94%, #000 6%);
-  overflow: hidden;
-}
-.ca-audit .ca-pane h5 {
-  margin: 0; padding: 10px 12px;
-  background: color-mix(in srgb, var(--accent2) 85%, #000 15%);
-  color: #fff; font-weight: 700; border-bottom: 1px solid rgba(0,0,0,.2);
-}
-.ca-audit .ca-kv { width: 100%; border-collapse: collapse; }
-.ca-audit .ca-kv th, .ca-audit .ca-kv td {
-  text-align: left; padding: 8px 12px; border-bottom: 1px solid var(--border); vertical-align: top;
-}
-.ca-audit .ca-kv th {
-  width: 210px; white-space: nowrap;
-  background: color-mix(in srgb, var(--accent2) 12%, var(--card)); font-weight: 600;
-}
-.ca-audit .ca-kv tr:last-child td, .ca-audit .ca-kv tr:last-child th { border-bottom: 0; }
-
-/* Toolbar (search + view more) */
-.ca-audit .ca-toolbar{
-  display:flex; gap:10px; align-items:center; margin:6px 2px 0 2px; flex-wrap:wrap;
-}
-.ca-audit .ca-toolbar input[type="search"]{
-  padding:6px 10px; border-radius:999px; border:1px solid var(--border);
-  background:var(--card); color:var(--text); min-width:220px; outline:none;
-}
-.ca-audit .ca-toolbar .btn{
-  padding:6px 12px; border:1px solid var(--border); border-radius:999px;
-  background:var(--card); cursor:pointer; font-weight:600;
-}
-.ca-audit .ca-toolbar .btn.primary{
-  background:linear-gradient(90deg,var(--accent2),var(--accent));
-  color:#fff; border-color:transparent;
-}
-
-/* Wrap long JSON in details cell */
-.ca-audit .cp-json, .ca-audit .cp-json pre, .ca-audit .cp-json code {
-  white-space: pre-wrap !important; word-break: break-word !important; overflow-x: hidden !important;
-}
-.ca-audit .chart-container canvas {
-  max-height: 240px !important;
-  width: 100% !important;
-}
-"""
-
-# ----------------------- module-local JS -------------------------
-CA_AUDIT_JS = r"""
-(function () {
-  const root = document.querySelector('.ca-audit') || document;
-
-  // Known table ids from reporting.py
-  const top = root.querySelector('#tbl-ca-policies');
-  const det = root.querySelector('#tbl-ca-policy-details');
-  if (top) top.setAttribute('data-key','ca_policies');
-  if (det) det.setAttribute('data-key','ca_policy_details');
-  if (!top) return;
-
-  // ---- helpers ----
-  const txt = el => (el?.textContent || '').trim();
-  const slug = s => (s||'').toLowerCase().replace(/[^a-z0-9]+/g,'-');
-
-  function hideColumns(table, keepSet) {
-    const HIDE_ALWAYS = new Set(['Id', 'Details']);
-    const ths = Array.from(table.querySelectorAll('thead th'));
-    const idxByName = new Map();
-    ths.forEach((th,i)=> idxByName.set((th.textContent || '').trim(), i));
-    ths.forEach((th,i)=>{
-      const name = (th.textContent || '').trim();
-      if (HIDE_ALWAYS.has(name) || !keepSet.has(name)) {
-        table.querySelectorAll(`thead th:nth-child(${i+1}), tbody td:nth-child(${i+1})`)
-             .forEach(c => c.classList.add('ca-hide'));
-      }
-    });
-    return idxByName;
-  }
-
-  function buildDetailsMap(table){
-    const map = new Map();
-    if (!table) return map;
-    const headers = Array.from(table.querySelectorAll('thead th')).map(h=>txt(h));
-    Array.from(table.querySelectorAll('tbody tr')).forEach(tr=>{
-      const tds = Array.from(tr.children);
-      if (!tds.length) return;
-      const id = txt(tds[0]);
-      const m = {};
-      headers.forEach((name, idx) => m[name] = tds[idx] ? tds[idx].innerHTML : '');
-      map.set(id, m);
-    });
-    return map;
-  }
-
-  function attachRowDrawer(table, options){
-    const { idIdx, nameIdx, detailsById, isDetailsTable } = options;
-    const headCells = Array.from(table.querySelectorAll('thead th'));
-    const totalCols = headCells.length;
-
-    Array.from(table.querySelectorAll('tbody tr')).forEach(tr=>{
-      const idCell   = idIdx >= 0 ? tr.children[idIdx] : null;
-      const nameCell = nameIdx >= 0 ? tr.children[nameIdx] : tr.children[0];
-      if (!nameCell) return;
-
-      const label = txt(nameCell);
-      nameCell.innerHTML = `<span class="ca-name"><span class="ca-chevron">▸</span><span class="ca-label"></span></span>`;
-      nameCell.querySelector('.ca-label').textContent = label;
-
-      tr.classList.add('ca-clickable');
-      tr.addEventListener('click', ()=>{
-        const pid  = idCell ? txt(idCell) : (isDetailsTable ? txt(tr.children[0]) : '');
-        const open = tr.classList.contains('ca-open');
-        const next = tr.nextElementSibling;
-        if (next && next.classList.contains('ca-expander')) next.remove();
-        tr.classList.remove('ca-open');
-        if (open) return;
-
-        let src = {};
-        if (isDetailsTable) {
-          const headers = Array.from(table.querySelectorAll('thead th')).map(h=>txt(h));
-          const tds = Array.from(tr.children);
-          headers.forEach((name, idx) => src[name] = tds[idx] ? tds[idx].innerHTML : '');
-        } else {
-          src = detailsById.get(pid) || {};
-        }
+# ------------------- module-local CSS/JS assets ------------------
+ASSETS_DIR = pathlib.Path(__file__).parent / "assets"
 
-        const state   = src['State'] || '';
-        const apps    = src['Apps'] || '';
-        const users   = src['Users'] || '';
-        const grants  = src['Grant'] || '';
-        const sess    = src['Session'] || '';
-        const notes   = src['Notes'] || '';
-        const details = src['Details'] || '';
-
-        const html = `
-          <div class="ca-expander-body">
-            <div class="ca-flex">
-              <div class="ca-pane">
-                <h5>Overview</h5>
-                <table class="ca-kv"><tbody>
-                  <tr><th>Name</th><td>${label}</td></tr>
-                  <tr><th>Id</th><td>${pid || '<em>unknown</em>'}</td></tr>
-                  <tr><th>State</th><td>${state}</td></tr>
-                  <tr><th>Users/Groups</th><td>${users}</td></tr>
-                  <tr><th>Apps</th><td>${apps}</td></tr>
-                  <tr><th>Grant Controls</th><td>${grants}</td></tr>
-                  <tr><th>Session</th><td>${sess}</td></tr>
-                  <tr><th>Notes</th><td>${notes || '-'}</td></tr>
-                </tbody></table>
-              </div>
-              <div class="ca-pane">
-                <h5>Details</h5>
-                <table class="ca-kv"><tbody>
-                  <tr><th>Full Object</th><td>${details || '<em>none available</em>'}</td></tr>
-                </tbody></table>
-              </div>
-            </div>
-          </div>`;
-
-        const exp = document.createElement('tr');
-        const td  = document.createElement('td');
-        exp.className = 'ca-expander';
-        td.colSpan = totalCols;
-        td.innerHTML = html;
-        exp.appendChild(td);
-        tr.parentNode.insertBefore(exp, tr.nextSibling);
-        tr.classList.add('ca-open');
-
-        const chev = tr.querySelector('.ca-chevron');
-        if (chev) chev.textContent = '▾';
-      });
-    });
-  }
-
-  function addToolbar(table, title){
-    const card = table.closest('.card');
-    if (!card) return;
-    const bar = document.createElement('div');
-    bar.className = 'ca-toolbar';
-    bar.innerHTML = `
-      <input type="search" placeholder="Search ${title}…" aria-label="Search ${title}">
-      <button class="btn primary" data-action="viewmore" style="display:none">View more…</button>
-    `;
-    card.insertBefore(bar, card.querySelector('.tablewrap'));
-    return bar;
-  }
-
-  function paginateAndSearch(table, toolbar){
-    const search = toolbar.querySelector('input[type="search"]');
-    const viewMoreBtn = toolbar.querySelector('[data-action="viewmore"]');
-    const rows = Array.from(table.querySelectorAll('tbody tr'));
-    const PAGE = 20; let expanded = false;
-
-    function apply(){
-      const q = (search.value||'').toLowerCase();
-      let shown = 0;
-      rows.forEach((tr)=>{
-        const match = !q || tr.textContent.toLowerCase().includes(q);
-        if (!match) { tr.style.display = 'none'; return; }
-        if (!expanded && q === '' && shown >= PAGE) { tr.style.display = 'none'; return; }
-        tr.style.display = ''; shown++;
-      });
-      const moreExists = rows.filter(tr => tr.style.display !== 'none').length < rows.length && q === '' && !expanded;
-      viewMoreBtn.style.display = moreExists ? '' : 'none';
-    }
+@functools.lru_cache(maxsize=1)
+def _css() -> str:
+    """Module-scoped CSS (assets/ca_audit.css), read once per process."""
+    return (ASSETS_DIR / "ca_audit.css").read_text(encoding="utf-8")
 
-    apply();
-    search.addEventListener('input', apply);
-    viewMoreBtn.addEventListener('click', ()=>{ expanded = true; apply(); });
-  }
-
-  // ------------ Overview table (top) ------------
-  const keepTop = new Set(['Id','Name','State','Scope','Risk']);
-  const idxTop  = hideColumns(top, keepTop);
-  const detMap  = buildDetailsMap(det);
-  attachRowDrawer(top, {
-    idIdx: idxTop.has('Id') ? idxTop.get('Id') : -1,
-    nameIdx: idxTop.has('Name') ? idxTop.get('Name') : -1,
-    detailsById: detMap,
-    isDetailsTable: false
-  });
-  const barTop = addToolbar(top, 'CA Policies');
-  if (barTop) paginateAndSearch(top, barTop);
-
-  // ------------ Details table (det) ------------
-  if (det) {
-    const headers = Array.from(det.querySelectorAll('thead th')).map(h=>txt(h));
-    const idIdx   = headers.indexOf('Id');
-    const nameIdx = headers.indexOf('Name');
-
-    // Hide Id and Details columns in the grid (data remains for the drawer)
-    headers.forEach((name, idx)=>{
-      if (name === 'Id' || name === 'Details') {
-        det.querySelectorAll(`thead th:nth-child(${idx+1}), tbody td:nth-child(${idx+1})`)
-          .forEach(c => c.classList.add('ca-hide'));
-      }
-    });
-
-    attachRowDrawer(det, {
-      idIdx: idIdx >= 0 ? idIdx : 0,
-      nameIdx: nameIdx >= 0 ? nameIdx : 1,
-      detailsById: null,
-      isDetailsTable: true
-    });
-
-    const barDet = addToolbar(det, 'CA Policy Details');
-    if (barDet) paginateAndSearch(det, barDet);
-  }
-})();
-"""
+@functools.lru_cache(maxsize=1)
+def _js() -> str:
+    """Drawer/search behaviour (assets/ca_audit.js), read once per process."""
+    return (ASSETS_DIR / "ca_audit.js").read_text(encoding="utf-8")
 
 # ----------------------- helpers & scoring -----------------------
 
 def _iso_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
+_TRUE = frozenset(("true","1","yes","enabled"))
+
 def _norm_bool(v) -> bool:
-    s = str(v).strip().lower()
-    return s in ("true","1","yes","enabled")
+    # Graph sends real booleans almost always; skip str()/lower() for them
+    if v is True: return True
+    if v is False or v is None: return False
+    return str(v).strip().lower() in _TRUE
+
+_EMPTY_LIST: list = []   # shared; callers only read it
 
 def _safe_list(x):
-    return x if isinstance(x, list) else []
+    return x if type(x) is list else _EMPTY_LIST
 
 def _scope_summary(assignments: Dict[str, Any]) -> str:
     if not isinstance(assignments, dict):
@@ -356,6 +111,14 @@ def _grant_summary(grant_controls: Dict[str, Any]) -> str:
         parts = ["Allow (no controls)"]
     return f"{' + '.join(parts)} ({op})"
 
+_SESSION_FLAGS = (
+    ("applicationEnforcedRestrictions", "AER"),
+    ("signInFrequency",                 "SIF"),
+    ("persistentBrowser",               "PB"),
+    ("continuousAccessEvaluation",      "CAE"),
+    ("cloudAppSecurity",                "MCAS"),
+)
+
 def _session_summary(session_controls) -> str:
     """
     Summarize session controls. Robust to None/non-dict shapes.
@@ -369,17 +132,11 @@ def _session_summary(session_controls) -> str:
     if not isinstance(session_controls, dict):
         return "-"
 
-    def _is_enabled(d, key) -> bool:
-        v = d.get(key)
-        return isinstance(v, dict) and _norm_bool(v.get("isEnabled"))
-
     flags = []
-    if _is_enabled(session_controls, "applicationEnforcedRestrictions"): flags.append("AER")
-    if _is_enabled(session_controls, "signInFrequency"):                  flags.append("SIF")
-    if _is_enabled(session_controls, "persistentBrowser"):                flags.append("PB")
-    if _is_enabled(session_controls, "continuousAccessEvaluation"):       flags.append("CAE")
-    if _is_enabled(session_controls, "cloudAppSecurity"):                 flags.append("MCAS")
-
+    for key, flag in _SESSION_FLAGS:
+        v = session_controls.get(key)
+        if isinstance(v, dict) and _norm_bool(v.get("isEnabled")):
+            flags.append(flag)
     return ", ".join(flags) or "-"
 
 def _policy_notes(p: Dict[str, Any]) -> List[str]:
@@ -388,31 +145,31 @@ def _policy_notes(p: Dict[str, Any]) -> List[str]:
     """
     notes = []
     state = (p.get("state") or "").lower()
+
+    # Not enforced at all: the remaining heuristics don't apply
+    if state == "disabled":
+        return ["Policy is disabled"]
+
     cond = p.get("conditions") or {}
     apps = cond.get("applications") or {}
-    users = (p.get("conditions") or {}).get("users") or {}
+    users = cond.get("users") or {}
     grant = p.get("grantControls") or {}
     session = p.get("sessionControls")
-    if not isinstance(session, dict):
-        notes.append("No session hardening (SIF/AER/CAE/MCAS)")
-    else:
-        has_enabled = False
-        for k, v in session.items():
-            if isinstance(v, dict) and _norm_bool(v.get("isEnabled")):
-                has_enabled = True
-                break
-        if not has_enabled:
-            notes.append("No session hardening (SIF/AER/CAE/MCAS)")
-
 
     all_users = users.get("includeUsers") == ["All"]
     exclude_users = _safe_list(users.get("excludeUsers"))
     all_apps = apps.get("includeApplications") == ["All"]
     grant_controls = _safe_list(grant.get("builtInControls"))
+    grant_controls_lc = {x.lower() for x in grant_controls if isinstance(x, str)}
+    session_hardened = isinstance(session, dict) and any(
+        isinstance(v, dict) and _norm_bool(v.get("isEnabled")) for v in session.values()
+    )
 
-    # Disabled or report-only
-    if state == "disabled":
-        notes.append("Policy is disabled")
+    # No session controls at all
+    if not session_hardened:
+        notes.append("No session hardening (SIF/AER/CAE/MCAS)")
+
+    # Report-only
     if state == "enabledforreportingbutnotenforced":
         notes.append("Policy is report-only (not enforced)")
 
@@ -420,17 +177,13 @@ def _policy_notes(p: Dict[str, Any]) -> List[str]:
     if all_users and all_apps and (not grant_controls):
         notes.append("All users + All apps + Allow (no controls)")
 
-    if all_users and all_apps and ("mfa" not in [x.lower() for x in grant_controls]):
+    if all_users and all_apps and ("mfa" not in grant_controls_lc):
         notes.append("All users + All apps without MFA")
 
     # Very broad exclusions
-    if all_users and exclude_users and len(exclude_users) > 0:
+    if all_users and exclude_users:
         notes.append(f"All users with {len(exclude_users)} exclusion(s) - verify excludes")
 
-    # No session controls at all
-    if not session or all(not _norm_bool(v.get("isEnabled")) for v in session.values() if isinstance(v, dict)):
-        notes.append("No session hardening (SIF/AER/CAE/MCAS)")
-
     # Client apps condition absent (legacy protocols might slip)
     client_apps = (cond.get("clientAppTypes") or [])
     if not client_apps:
@@ -457,17 +210,22 @@ def _policy_notes(p: Dict[str, Any]) -> List[str]:
 def _risk_score(p: Dict[str, Any], notes: List[str]) -> int:
     """
     Quick impact x likelihood heuristic for ordering.
+    Disabled policies have no impact and score the minimum (sort last).
     """
+    state = (p.get("state") or "").lower()
+    if state == "disabled":
+        return 1
+
     impact = 0
     cond = p.get("conditions") or {}
     apps = cond.get("applications") or {}
-    users = (p.get("conditions") or {}).get("users") or {}
+    users = cond.get("users") or {}
     all_users = users.get("includeUsers") == ["All"]
     all_apps = apps.get("includeApplications") == ["All"]
 
     if all_users: impact += 20
     if all_apps:  impact += 20
-    if (p.get("state") or "").lower() == "enabled": impact += 10
+    if state == "enabled": impact += 10
 
     likelihood = 1
     if any("no controls" in n.lower() for n in notes): likelihood += 10
@@ -505,71 +263,47 @@ def _get_policies(client) -> List[Dict[str, Any]]:
             fncPrintMessage(f"CA policies beta failed: {ex2}", "error")
             return []
 
-# --------------------- Module entry point -----------------------
-
-def run(client, args):
-    run_id = fncNewRunId("ca")
-    ts = datetime.now(timezone.utc).isoformat()
-
-    policies = _get_policies(client) or []
-
-    overview_rows: List[Dict[str, Any]] = []
-    detail_rows:   List[Dict[str, Any]] = []
-
-    bucket_counts = {"critical":0, "warning":0, "ok":0, "unknown":0}
-    enabled_count = 0
-    report_only   = 0
-    disabled_count= 0
-    flagged_count = 0
-
-    top_risky = None
+# --------------------- per-policy rows ---------------------------
 
+def _iter_policies(policies: List[Dict[str, Any]]):
+    """
+    Single pass over the policies yielding
+    (overview_row, detail_row, state_lc, notes, bucket).
+    Detail blobs reference the policy's own sub-dicts (no copies), so
+    callers must treat the returned rows as read-only.
+    """
     for p in policies:
         pid   = p.get("id","")
         name  = p.get("displayName","")
         state = (p.get("state") or "").replace("enabledForReportingButNotEnforced","ReportOnly")
         cond  = p.get("conditions") or {}
+        users_cond = cond.get("users") or {}
         grant = p.get("grantControls") or {}
         sess = p.get("sessionControls")
         if not isinstance(sess, dict):
             sess = {}
 
-        if state.lower() == "enabled": enabled_count += 1
-        elif state.lower() == "disabled": disabled_count += 1
-        else: report_only += 1
-
-        scope = _scope_summary(p.get("conditions",{}).get("users") and p.get("conditions") or p.get("conditions"))
-        # (The above line keeps format similar to other modules; safe either way.)
-        scope = _scope_summary(p.get("conditions") or {})
-        apps  = _apps_summary(cond)
-        grants= _grant_summary(grant)
-        sesst = _session_summary(sess)
-
+        scope = _scope_summary(cond)
         notes = _policy_notes(p)
-        if notes: flagged_count += 1
         risk = _risk_score(p, notes)
         bucket = _bucket_from_risk(risk)
-        bucket_counts[bucket] = bucket_counts.get(bucket,0)+1
-
-        if (top_risky is None) or (risk > top_risky["risk"]):
-            top_risky = {"name": name or pid, "risk": risk, "bucket": bucket}
 
         # ---- Overview ----
-        overview_rows.append({
+        overview_row = {
             "Id": pid,
             "Name": name,
             "State": state or "-",
             "Scope": scope,
             "Risk": risk,
-        })
+        }
 
         # ---- Details ----
         details_blob = {
             "General": {
                 "Id": pid, "Name": name, "State": state or "-",
             },
-            "Assignments": p.get("conditions",{}).get("users") or {},
-            "Applications": (p.get("conditions",{}).get("applications") or {}),
+            "Assignments": users_cond,
+            "Applications": cond.get("applications") or {},
             "Conditions": cond,
             "GrantControls": grant,
             "SessionControls": sess,
@@ -577,28 +311,66 @@ def run(client, args):
             "Score": {"risk": risk, "bucket": bucket},
         }
 
-        detail_rows.append({
+        detail_row = {
             "Id": pid,
             "Name": name,
             "State": state or "-",
-            "Users": _scope_summary(p.get("conditions") or {}),
-            "Apps": apps,
-            "Grant": grants,
-            "Session": sesst,
+            "Users": scope,
+            "Apps": _apps_summary(cond),
+            "Grant": _grant_summary(grant),
+            "Session": _session_summary(sess),
             "Notes": "; ".join(notes),
             "Details": details_blob,
-        })
+        }
+
+        yield overview_row, detail_row, state.lower(), notes, bucket
+
+# --------------------- Module entry point -----------------------
+
+def run(client, args):
+    run_id = fncNewRunId("ca")
+    ts = datetime.now(timezone.utc).isoformat()
+
+    policies = _get_policies(client) or []
+
+    overview_rows: List[Dict[str, Any]] = []
+    detail_rows:   List[Dict[str, Any]] = []
+
+    bucket_counts = {"critical":0, "warning":0, "ok":0, "unknown":0}
+    enabled_count = 0
+    report_only   = 0
+    disabled_count= 0
+    flagged_count = 0
 
-    # Sort overview by risk desc
-    overview_rows.sort(key=lambda r: r["Risk"], reverse=True)
+    for ov, det, state_lc, notes, bucket in _iter_policies(policies):
+        if state_lc == "enabled": enabled_count += 1
+        elif state_lc == "disabled": disabled_count += 1
+        else: report_only += 1
+
+        # Disabled policies only carry the "disabled" note; don't count them as flagged
+        if notes and state_lc != "disabled": flagged_count += 1
+        bucket_counts[bucket] += 1
+
+        overview_rows.append(ov)
+        detail_rows.append(det)
+
+    # Sort overview by risk desc (the HTML table shows every row in this order).
+    # The sort is stable, so row 0 is also the first policy with the top score.
+    overview_rows.sort(key=itemgetter("Risk"), reverse=True)
+    top_risky = None
+    if overview_rows:
+        top = overview_rows[0]
+        top_risky = {"name": top["Name"] or top["Id"], "risk": top["Risk"], "bucket": _bucket_from_risk(top["Risk"])}
 
     # Console table
     fncPrintMessage("[•] CA Policies (sorted by risk)", "info")
     print(fncToTable(
-        overview_rows,
+        overview_rows[:CONSOLE_TOP],
         headers=["Name","State","Scope","Risk"],
-        max_rows=len(overview_rows),
+        max_rows=CONSOLE_TOP,
     ))
+    if len(overview_rows) > CONSOLE_TOP:
+        fncPrintMessage(f"(showing {CONSOLE_TOP} of {len(overview_rows)} — full list in the HTML/JSON report)", "info")
 
     # ---------- Dashboard content ----------
     total = len(policies)
@@ -621,10 +393,10 @@ def run(client, args):
 
     severity_labels = ["Critical","Warning","OK","Unknown"]
     severity_values = [
-        bucket_counts.get("critical",0),
-        bucket_counts.get("warning",0),
-        bucket_counts.get("ok",0),
-        bucket_counts.get("unknown",0),
+        bucket_counts["critical"],
+        bucket_counts["warning"],
+        bucket_counts["ok"],
+        bucket_counts["unknown"],
     ]
 
     data = {
@@ -646,8 +418,8 @@ def run(client, args):
         "_standouts": standouts,
 
         # ===== Scoped styling/behaviour =====
-        "_inline_css": CA_AUDIT_CSS,
-        "_inline_js":  CA_AUDIT_JS,
+        "_inline_css": _css(),
+        "_inline_js":  _js(),
         "_container_class": "ca-audit",
         "_title": "Conditional Access Audit",
         "_subtitle": "Detect overly-permissive or weak CA policies",
@@ -655,7 +427,9 @@ def run(client, args):
 
     if getattr(args, "html", None):
         path = args.html if args.html.endswith(".html") else args.html + ".html"
-        fncWriteHTMLReport(path, "ca_audit", data)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8", buffering=HTML_WRITE_BUFFER) as fh:
+            fncWriteHTMLReport(fh, "ca_audit", data)
 
     fncPrintMessage("Conditional Access Audit module complete.", "success")
     return data
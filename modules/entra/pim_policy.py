@@ -3,16 +3,20 @@
 # Purpose  : Entra PIM (Privileged Identity Management) Role Audit
 # ================================================================
 
+import functools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Tuple
-import requests
+from itertools import chain
+from operator import attrgetter
+from typing import Dict, Any, List, Set, Tuple
 
 from core.utils import (
     fncPrintMessage,
     fncToTable,
     fncNewRunId,
 )
-from core.reporting import fncWriteHTMLReport
+from core.reporting import fncWriteHTMLReport, fncMinifyCSS, fncMinifyJS
 
 REQUIRED_PERMS = [
     "Directory.Read.All",
@@ -99,23 +103,33 @@ PIM_JS = r"""
 
   // ---- helpers ----
   const txt = el => (el?.textContent || '').trim();
+  const ESC = {'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'};
+  const esc = s => String(s).replace(/[&<>"]/g, c => ESC[c]);
+
+  // Hide every masked column in one walk over the rows (no per-column selectors)
+  function hideByMask(table, ths, mask) {
+    ths.forEach((th,i)=>{ if (mask[i]) th.classList.add('pa-hide'); });
+    for (const body of table.tBodies) {
+      for (const tr of body.rows) {
+        const cells = tr.cells;
+        for (let i = 0; i < mask.length; i++) {
+          if (mask[i] && cells[i]) cells[i].classList.add('pa-hide');
+        }
+      }
+    }
+  }
 
   function hideColumns(table, keepSet) {
     // Always hide these if present (we use them inside the drawer)
     const HIDE_ALWAYS = new Set(['source', 'roleId']);
     const ths = Array.from(table.querySelectorAll('thead th'));
     const idxByName = new Map();
-    ths.forEach((th,i)=> idxByName.set((th.textContent || '').trim(), i));
-
-    ths.forEach((th,i)=>{
-      const name = (th.textContent || '').trim();
-      if (HIDE_ALWAYS.has(name.toLowerCase()) || !keepSet.has(name)) {
-        table
-          .querySelectorAll(`thead th:nth-child(${i+1}), tbody td:nth-child(${i+1})`)
-          .forEach(c => c.classList.add('pa-hide'));
-      }
+    const mask = ths.map((th,i)=>{
+      const name = txt(th);
+      idxByName.set(name, i);
+      return HIDE_ALWAYS.has(name.toLowerCase()) || !keepSet.has(name);
     });
-
+    hideByMask(table, ths, mask);
     return idxByName;
   }
 
@@ -127,75 +141,82 @@ PIM_JS = r"""
     // Build a header map to pull cell values by header name
     const headers = headCells.map(h=>txt(h));
 
-    Array.from(table.querySelectorAll('tbody tr')).forEach(tr=>{
+    const tbody = table.tBodies[0];
+    if (!tbody) return;
+
+    // One-shot decoration: a single innerHTML write per name cell (label pre-escaped)
+    Array.from(tbody.rows).forEach(tr=>{
       const nameCell = nameCol >= 0 ? tr.children[nameCol] : tr.children[0];
       if (!nameCell) return;
-      const label = txt(nameCell);
-      nameCell.innerHTML = `<span class="pa-name"><span class="pa-chevron">▸</span><span class="pa-label"></span></span>`;
-      nameCell.querySelector('.pa-label').textContent = label;
-
+      nameCell.innerHTML = '<span class="pa-name"><span class="pa-chevron">▸</span><span class="pa-label">'
+                         + esc(txt(nameCell)) + '</span></span>';
       tr.classList.add('pa-clickable');
-      tr.addEventListener('click', ()=>{
-        const open = tr.classList.contains('pa-open');
-        const next = tr.nextElementSibling;
-        if (next && next.classList.contains('pa-expander')) next.remove();
-        tr.classList.remove('pa-open');
-        if (open) return;
-
-        // Collect row data into a map {Header: innerHTML}
-        const cells = Array.from(tr.children);
-        const row = {};
-        headers.forEach((h, i) => row[h] = cells[i] ? cells[i].innerHTML : '');
-
-        // Pull common fields (handle header case variations)
-        const pick = (k) => row[k] || row[k.toLowerCase()] || row[k.toUpperCase()] || '';
-        const pname  = pick('principalName') || label;
-        const ptype  = pick('principalType') || '';
-        const rname  = pick('roleName') || '';
-        const rid    = pick('roleId') || '';
-        const start  = pick('start') || '-';
-        const end    = pick('end') || '-';
-        const status = pick('status') || '';
-        const risk   = pick('risk') || '';
-        const bucket = pick('bucket') || '';
-        const details= pick('Details') || '';
-
-        const html = `
-          <div class="pa-expander-body">
-            <div class="pa-flex">
-              <div class="pa-pane">
-                <h5>Overview</h5>
-                <table class="pa-kv"><tbody>
-                  <tr><th>Principal</th><td>${pname}</td></tr>
-                  <tr><th>Type</th><td>${ptype}</td></tr>
-                  <tr><th>Role</th><td>${rname}</td></tr>
-                  <tr><th>Role Id</th><td>${rid}</td></tr>
-                  <tr><th>Status</th><td>${status}</td></tr>
-                  <tr><th>Risk / Bucket</th><td>${risk} / ${bucket}</td></tr>
-                  <tr><th>Window</th><td>${start} → ${end}</td></tr>
-                </tbody></table>
-              </div>
-              <div class="pa-pane">
-                <h5>Details</h5>
-                <table class="pa-kv"><tbody>
-                  <tr><th>Full Object</th><td>${details || '<em>none available</em>'}</td></tr>
-                </tbody></table>
-              </div>
+    });
+
+    // One delegated listener for every row in this table
+    tbody.addEventListener('click', e=>{
+      const tr = e.target.closest('tr');
+      if (!tr || tr.parentNode !== tbody || !tr.classList.contains('pa-clickable')) return;
+      const label = txt(tr.querySelector('.pa-label'));
+      const open = tr.classList.contains('pa-open');
+      const next = tr.nextElementSibling;
+      if (next && next.classList.contains('pa-expander')) next.remove();
+      tr.classList.remove('pa-open');
+      if (open) return;
+
+      // Collect row data into a map {Header: innerHTML}
+      const cells = Array.from(tr.children);
+      const row = {};
+      headers.forEach((h, i) => row[h] = cells[i] ? cells[i].innerHTML : '');
+
+      // Pull common fields (handle header case variations)
+      const pick = (k) => row[k] || row[k.toLowerCase()] || row[k.toUpperCase()] || '';
+      const pname  = pick('principalName') || label;
+      const ptype  = pick('principalType') || '';
+      const rname  = pick('roleName') || '';
+      const rid    = pick('roleId') || '';
+      const start  = pick('start') || '-';
+      const end    = pick('end') || '-';
+      const status = pick('status') || '';
+      const risk   = pick('risk') || '';
+      const bucket = pick('bucket') || '';
+      const details= pick('Details') || '';
+
+      const html = `
+        <div class="pa-expander-body">
+          <div class="pa-flex">
+            <div class="pa-pane">
+              <h5>Overview</h5>
+              <table class="pa-kv"><tbody>
+                <tr><th>Principal</th><td>${pname}</td></tr>
+                <tr><th>Type</th><td>${ptype}</td></tr>
+                <tr><th>Role</th><td>${rname}</td></tr>
+                <tr><th>Role Id</th><td>${rid}</td></tr>
+                <tr><th>Status</th><td>${status}</td></tr>
+                <tr><th>Risk / Bucket</th><td>${risk} / ${bucket}</td></tr>
+                <tr><th>Window</th><td>${start} → ${end}</td></tr>
+              </tbody></table>
             </div>
-          </div>`;
-
-        const exp = document.createElement('tr');
-        const td  = document.createElement('td');
-        exp.className = 'pa-expander';
-        td.colSpan = totalCols;
-        td.innerHTML = html;
-        exp.appendChild(td);
-        tr.parentNode.insertBefore(exp, tr.nextSibling);
-        tr.classList.add('pa-open');
-
-        const chev = tr.querySelector('.pa-chevron');
-        if (chev) chev.textContent = '▾';
-      });
+            <div class="pa-pane">
+              <h5>Details</h5>
+              <table class="pa-kv"><tbody>
+                <tr><th>Full Object</th><td>${details || '<em>none available</em>'}</td></tr>
+              </tbody></table>
+            </div>
+          </div>
+        </div>`;
+
+      const exp = document.createElement('tr');
+      const td  = document.createElement('td');
+      exp.className = 'pa-expander';
+      td.colSpan = totalCols;
+      td.innerHTML = html;
+      exp.appendChild(td);
+      tbody.insertBefore(exp, tr.nextSibling);
+      tr.classList.add('pa-open');
+
+      const chev = tr.querySelector('.pa-chevron');
+      if (chev) chev.textContent = '▾';
     });
   }
 
@@ -244,15 +265,12 @@ PIM_JS = r"""
     const idx = (function hide(){
       const ths = Array.from(tbl.querySelectorAll('thead th'));
       const idxByName = new Map();
-      ths.forEach((th,i)=> idxByName.set((th.textContent || '').trim(), i));
-      ths.forEach((th,i)=>{
-        const name = (th.textContent || '').trim();
-        const k = name.toLowerCase();
-        if (!keep.has(name) && !keep.has(k)) {
-          tbl.querySelectorAll(`thead th:nth-child(${i+1}), tbody td:nth-child(${i+1})`)
-             .forEach(c => c.classList.add('pa-hide'));
-        }
+      const mask = ths.map((th,i)=>{
+        const name = txt(th);
+        idxByName.set(name, i);
+        return !keep.has(name) && !keep.has(name.toLowerCase());
       });
+      hideByMask(tbl, ths, mask);
       return idxByName;
     })();
 
@@ -276,27 +294,16 @@ PIM_JS = r"""
 })();
 """
 
+# Minified once at import; these are what the report inlines
+PIM_CSS_MIN = fncMinifyCSS(PIM_CSS)
+PIM_JS_MIN  = fncMinifyJS(PIM_JS)
+
 
 # ----------------------- Helpers -----------------------
 
 def _iso_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
-def _client_headers(client) -> Dict[str,str]:
-    # Try common attributes; fall back to token
-    hdrs = getattr(client, "headers", None) or getattr(client, "_headers", None)
-    if isinstance(hdrs, dict):
-        return hdrs
-    token = getattr(client, "token", "") or getattr(client, "_token", "")
-    return {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
-
-def _client_handle_response(client):
-    # Support both older and newer client implementations
-    return getattr(client, "_handle_response", None) or getattr(client, "fncHandleResponse", None)
-
 def _safe_get(obj: Dict, *path, default=None):
     cur = obj
     for k in path:
@@ -306,20 +313,80 @@ def _safe_get(obj: Dict, *path, default=None):
     return cur
 
 OR_LIMIT = 15  # Graph limit for OR'd child clauses
+GET_BY_IDS_MAX = 1000  # Graph limit for ids per getByIds call
+HYDRATE_WORKERS = 8
 
 def _post_get_by_ids(client, ids, types):
     """
-    Preferred: POST /directoryObjects/getByIds
+    Preferred: POST /directoryObjects/getByIds (≤1000 ids per call).
+    Goes through client.post_json (retries, throttling, token refresh).
     """
     if not ids:
         return []
-    url = "https://graph.microsoft.com/v1.0/directoryObjects/getByIds"
-    payload = {"ids": list(dict.fromkeys(ids)), "types": types}
+    out = []
+    for i in range(0, len(ids), GET_BY_IDS_MAX):
+        data = client.post_json("directoryObjects/getByIds",
+                                {"ids": ids[i:i+GET_BY_IDS_MAX], "types": types})
+        if isinstance(data, dict):
+            out.extend(data.get("value", []))
+    return out
+
+BATCH_MAX = 20  # Graph limit for sub-requests per $batch call
+
+def _graph_batch(client, ids, collection: str, select: str) -> Dict[str, Dict[str, Any]] | None:
+    """
+    Fallback: one GET /{collection}/{id} per id through Graph $batch (20 per
+    call, batches sent concurrently). Ids of another type just 404. Returns
+    None when the client cannot batch or a batch call fails, so the caller
+    can use OR-filter chunks instead.
+    """
+    if not hasattr(client, "batch"):
+        return None
+    chunks = [ids[i:i+BATCH_MAX] for i in range(0, len(ids), BATCH_MAX)]
+    if not chunks:
+        return {}
+
+    def _send(chunk):
+        return client.batch([
+            {"id": cid, "method": "GET", "url": f"/{collection}/{cid}?$select={select}"}
+            for cid in chunk
+        ])
+
+    out = {}
+    try:
+        with ThreadPoolExecutor(max_workers=min(HYDRATE_WORKERS, len(chunks))) as executor:
+            for resp in executor.map(_send, chunks):
+                for sub in resp.values():
+                    body = sub.get("body")
+                    if sub.get("status") == 200 and isinstance(body, dict) and body.get("id"):
+                        out[body["id"]] = body
+    except Exception as ex:
+        fncPrintMessage(f"$batch ({collection}) failed, will chunk GETs: {ex}", "warn")
+        return None
+    return out
+
+def _get_or_chunks(client, ids, url_prefix: str, label: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Fallback: GET in OR'd id chunks (≤15); chunks are fetched concurrently.
+    """
+    chunks = [ids[i:i+OR_LIMIT] for i in range(0, len(ids), OR_LIMIT)]
+
+    def _fetch(chunk):
+        flt = " or ".join([f"id eq '{cid}'" for cid in chunk])
+        try:
+            return client.get_all(f"{url_prefix}&$filter={flt}") or []
+        except Exception as ex:
+            fncPrintMessage(f"{label} chunk fetch failed: {ex}", "warn")
+            return []
 
-    handler = _client_handle_response(client)
-    resp = requests.post(url, headers=_client_headers(client), json=payload)
-    data = handler(resp) if handler else resp.json()
-    return data.get("value", []) if isinstance(data, dict) else []
+    out = {}
+    if not chunks:
+        return out
+    with ThreadPoolExecutor(max_workers=min(HYDRATE_WORKERS, len(chunks))) as executor:
+        for rows in executor.map(_fetch, chunks):
+            for r in rows:
+                out[r["id"]] = r
+    return out
 
 def _get_role_definitions(client) -> Dict[str, Dict[str, Any]]:
     try:
@@ -360,153 +427,121 @@ def _get_eligibility_schedule_instances(client) -> List[Dict[str, Any]]:
 
 # --------- principal hydration (users, groups, sps) ----------
 
-def _batch_get_users(client, ids):
-    out = {}
-    if not ids:
-        return out
-    ids = list(dict.fromkeys(i for i in ids if i))
+_USER_SELECT  = "id,displayName,userPrincipalName,userType,accountEnabled"
+_SP_SELECT    = "id,displayName,servicePrincipalType,publisherName,appId,accountEnabled"
+_GROUP_SELECT = "id,displayName,securityEnabled,groupTypes,visibility"
 
-    # Preferred: POST getByIds
-    try:
-        objs = _post_get_by_ids(client, ids, ["user"])
-        for o in objs:
-            if isinstance(o, dict) and (o.get("@odata.type","").lower().endswith("user") or "userPrincipalName" in o):
-                out[o["id"]] = {
-                    "id": o.get("id"),
-                    "displayName": o.get("displayName"),
-                    "userPrincipalName": o.get("userPrincipalName"),
-                    "userType": o.get("userType"),
-                    "accountEnabled": o.get("accountEnabled"),
-                }
-        if len(out) == len(ids):
-            return out
-    except Exception as ex:
-        fncPrintMessage(f"getByIds (users) failed, will chunk GETs: {ex}", "warn")
+_PRINCIPAL_TYPES = ["user", "group", "servicePrincipal"]
 
-    # Fallback: GET in OR chunks (≤15)
-    for i in range(0, len(ids), OR_LIMIT):
-        chunk = ids[i:i+OR_LIMIT]
-        flt = " or ".join([f"id eq '{cid}'" for cid in chunk])
-        try:
-            rows = client.get_all(
-                "users?$select=id,displayName,userPrincipalName,userType,accountEnabled"
-                f"&$filter={flt}"
-            )
-            for r in rows or []:
-                out[r["id"]] = r
-        except Exception as ex:
-            fncPrintMessage(f"User chunk fetch failed: {ex}", "warn")
-    return out
-
-def _batch_get_sps(client, ids):
-    out = {}
-    if not ids:
-        return out
-    ids = list(dict.fromkeys(i for i in ids if i))
+# getByIds tags every object with its exact @odata.type
+_ODATA_USER  = "#microsoft.graph.user"
+_ODATA_GROUP = "#microsoft.graph.group"
+_ODATA_SP    = "#microsoft.graph.servicePrincipal"
 
-    # Preferred: POST getByIds
-    try:
-        objs = _post_get_by_ids(client, ids, ["servicePrincipal"])
-        for o in objs:
-            if isinstance(o, dict) and (o.get("@odata.type","").lower().endswith("serviceprincipal") or "appId" in o):
-                out[o["id"]] = {
-                    "id": o.get("id"),
-                    "displayName": o.get("displayName"),
-                    "servicePrincipalType": o.get("servicePrincipalType"),
-                    "publisherName": o.get("publisherName"),
-                    "appId": o.get("appId"),
-                    "accountEnabled": o.get("accountEnabled"),
-                }
-        if len(out) == len(ids):
-            return out
-    except Exception as ex:
-        fncPrintMessage(f"getByIds (servicePrincipals) failed, will chunk GETs: {ex}", "warn")
-
-    # Fallback: GET in OR chunks (≤15)
-    for i in range(0, len(ids), OR_LIMIT):
-        chunk = ids[i:i+OR_LIMIT]
-        flt = " or ".join([f"id eq '{cid}'" for cid in chunk])
-        try:
-            rows = client.get_all(
-                "servicePrincipals?"
-                "$select=id,displayName,servicePrincipalType,publisherName,appId,accountEnabled"
-                f"&$filter={flt}"
-            )
-            for r in rows or []:
-                out[r["id"]] = r
-        except Exception as ex:
-            fncPrintMessage(f"SP chunk fetch failed: {ex}", "warn")
-    return out
+def _user_brief(o: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": o.get("id"),
+        "displayName": o.get("displayName"),
+        "userPrincipalName": o.get("userPrincipalName"),
+        "userType": o.get("userType"),
+        "accountEnabled": o.get("accountEnabled"),
+    }
 
-def _batch_get_groups(client, ids):
-    out = {}
-    if not ids:
-        return out
-    ids = list(dict.fromkeys(i for i in ids if i))
+def _group_brief(o: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": o.get("id"),
+        "displayName": o.get("displayName"),
+        "securityEnabled": o.get("securityEnabled"),
+        "groupTypes": o.get("groupTypes") or [],
+        "visibility": o.get("visibility"),
+    }
 
-    # Preferred: POST getByIds
-    try:
-        objs = _post_get_by_ids(client, ids, ["group"])
-        for o in objs:
-            if not isinstance(o, dict) or "id" not in o:
-                continue
-            out[o["id"]] = {
-                "id": o.get("id"),
-                "displayName": o.get("displayName"),
-                "securityEnabled": o.get("securityEnabled"),
-                "groupTypes": o.get("groupTypes") or [],
-                "visibility": o.get("visibility"),
-            }
-        if len(out) == len(ids):
-            return out
-    except Exception as ex:
-        fncPrintMessage(f"getByIds (groups) failed, will chunk GETs: {ex}", "warn")
+def _sp_brief(o: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": o.get("id"),
+        "displayName": o.get("displayName"),
+        "servicePrincipalType": o.get("servicePrincipalType"),
+        "publisherName": o.get("publisherName"),
+        "appId": o.get("appId"),
+        "accountEnabled": o.get("accountEnabled"),
+    }
 
-    # Fallback: GET in OR chunks (≤15)
-    for i in range(0, len(ids), OR_LIMIT):
-        chunk = ids[i:i+OR_LIMIT]
-        flt = " or ".join([f"id eq '{cid}'" for cid in chunk])
+def _hydrate_all(client, ids) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    One mixed-type POST getByIds (chunked at 1000) for every principal,
+    partitioned by @odata.type. Ids it does not return are none of the three.
+    """
+    users, groups, sps = {}, {}, {}
+    by_type = {
+        _ODATA_USER:  (users,  _user_brief),
+        _ODATA_GROUP: (groups, _group_brief),
+        _ODATA_SP:    (sps,    _sp_brief),
+    }
+    for o in _post_get_by_ids(client, ids, _PRINCIPAL_TYPES):
+        if not isinstance(o, dict) or "id" not in o:
+            continue
+        hit = by_type.get(o.get("@odata.type"))
+        if hit is not None:
+            bucket, brief = hit
+            bucket[o["id"]] = brief(o)
+    return users, groups, sps
+
+def _get_by_type(client, ids, collection: str, select: str, label: str) -> Dict[str, Dict[str, Any]]:
+    # Fallback: per-id GETs via $batch, else OR chunks (≤15)
+    rows = _graph_batch(client, ids, collection, select)
+    if rows is None:
+        rows = _get_or_chunks(client, ids, f"{collection}?$select={select}", label)
+    return rows
+
+def _hydrate_by_type(client, ids) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    # Each lookup is per collection, so all three can probe the full id list at once
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        f_users  = executor.submit(_get_by_type, client, ids, "users", _USER_SELECT, "User")
+        f_groups = executor.submit(_get_by_type, client, ids, "groups", _GROUP_SELECT, "Group")
+        f_sps    = executor.submit(_get_by_type, client, ids, "servicePrincipals", _SP_SELECT, "SP")
+        return f_users.result(), f_groups.result(), f_sps.result()
+
+def _hydrate_principals(client, principal_ids: Set[str]) -> Dict[str, Dict[str, Any]]:
+    # Callers pass a deduplicated set; the helpers below take it as a list as-is
+    ids = list(principal_ids)
+
+    users, groups, sps = {}, {}, {}
+    if ids:
+        # Preferred: one getByIds pass for all three types
         try:
-            rows = client.get_all(
-                "groups?$select=id,displayName,securityEnabled,groupTypes,visibility"
-                f"&$filter={flt}"
-            )
-            for r in rows or []:
-                out[r["id"]] = r
+            users, groups, sps = _hydrate_all(client, ids)
         except Exception as ex:
-            fncPrintMessage(f"Group chunk fetch failed: {ex}", "warn")
-    return out
-
-def _hydrate_principals(client, principal_ids: List[str]) -> Dict[str, Dict[str, Any]]:
-    principal_ids = list(dict.fromkeys(principal_ids))
-    users  = _batch_get_users(client, principal_ids)
-    left   = [i for i in principal_ids if i not in users]
-    groups = _batch_get_groups(client, left)
-    left   = [i for i in left if i not in groups]
-    sps    = _batch_get_sps(client, left)
+            fncPrintMessage(f"getByIds (principals) failed, will chunk GETs: {ex}", "warn")
+            users, groups, sps = _hydrate_by_type(client, ids)
 
+    # Users win over groups over SPs; whatever is left after each is unresolved
     out = {}
     for k, v in users.items():
         out[k] = {"type": "User", "name": v.get("displayName") or v.get("userPrincipalName") or k, "raw": v}
-    for k, v in groups.items():
-        out[k] = {"type": "Group", "name": v.get("displayName") or k, "raw": v}
-    for k, v in sps.items():
-        out[k] = {"type": "ServicePrincipal", "name": v.get("displayName") or k, "raw": v}
-    for k in principal_ids:
-        out.setdefault(k, {"type": "Unknown", "name": k, "raw": {"id": k}})
+    left = principal_ids - users.keys()
+    for k in left & groups.keys():
+        out[k] = {"type": "Group", "name": groups[k].get("displayName") or k, "raw": groups[k]}
+    left -= groups.keys()
+    for k in left & sps.keys():
+        out[k] = {"type": "ServicePrincipal", "name": sps[k].get("displayName") or k, "raw": sps[k]}
+    left -= sps.keys()
+    for k in left:
+        out[k] = {"type": "Unknown", "name": k, "raw": {"id": k}}
     return out
 
 # ---- Risk heuristics ----
 
-CRITICAL_ROLES = {
+CRITICAL_ROLES = frozenset({
     "Global Administrator",
     "Privileged Role Administrator",
     "User Administrator",
     "Application Administrator",
     "Cloud Application Administrator",
     "Security Administrator",
-}
+})
 
+# Few distinct (role, type, eligible) inputs across thousands of rows
+@functools.lru_cache(maxsize=4096)
 def _score_assignment(role_name: str, prin_type: str, eligible: bool) -> int:
     base = 10 if role_name in CRITICAL_ROLES else 4
     if prin_type == "Group":
@@ -515,12 +550,36 @@ def _score_assignment(role_name: str, prin_type: str, eligible: bool) -> int:
         base = max(2, base - 3)
     return min(100, base * 6)
 
+@functools.lru_cache(maxsize=128)
 def _bucket_from_risk(r: int) -> str:
     if r is None: return "unknown"
     if r >= 80: return "critical"
     if r >= 40: return "warning"
     return "ok"
 
+class PimRow:
+    """One role assignment row. Slotted: large tenants produce 10^4+ of these."""
+    __slots__ = ("principalName", "principalType", "roleName", "roleId", "start", "end",
+                 "status", "risk", "bucket", "Details", "source")
+
+    def __init__(self, principalName, principalType, roleName, roleId, start, end,
+                 status, risk, bucket, Details, source):
+        self.principalName = principalName
+        self.principalType = principalType
+        self.roleName = roleName
+        self.roleId = roleId
+        self.start = start
+        self.end = end
+        self.status = status
+        self.risk = risk
+        self.bucket = bucket
+        self.Details = Details      # << dropdown-friendly column
+        self.source = source        # kept for completeness; hidden in JS
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Plain dict for tables / JSON / HTML export."""
+        return {s: getattr(self, s) for s in PimRow.__slots__}
+
 # ----------------------- Main -----------------------
 
 def run(client, args):
@@ -528,96 +587,114 @@ def run(client, args):
     ts = _iso_now()
     fncPrintMessage(f"Running PIM Role Audit (run={run_id})", "info")
 
-    defs = _get_role_definitions(client)
-    perms = _get_permanent_role_assignments(client) or []
-    active = _get_assignment_schedule_instances(client) or []
-    elig   = _get_eligibility_schedule_instances(client) or []
-
-    principal_ids = [r.get("principalId") for r in (perms + active + elig) if r.get("principalId")]
+    # Details/source only feed report drawers and exports; console-only runs skip them
+    want_details = bool(getattr(args, "html", None) or getattr(args, "export", None))
+    # The four collections are independent; fetch them concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        f_defs   = executor.submit(_get_role_definitions, client)
+        f_perms  = executor.submit(_get_permanent_role_assignments, client)
+        f_active = executor.submit(_get_assignment_schedule_instances, client)
+        f_elig   = executor.submit(_get_eligibility_schedule_instances, client)
+        defs   = f_defs.result()
+        perms  = f_perms.result() or []
+        active = f_active.result() or []
+        elig   = f_elig.result() or []
+
+    principal_ids = {pid for r in chain(perms, active, elig) if (pid := r.get("principalId"))}
     prin_map = _hydrate_principals(client, principal_ids)
 
-    perm_rows: List[Dict[str, Any]] = []
-    act_rows:  List[Dict[str, Any]] = []
-    eli_rows:  List[Dict[str, Any]] = []
+    # Same principal/role pairs recur across permanent, active and eligible
+    # rows; resolve names and score each (role, principal, eligible) once
+    score_cache: Dict[Tuple[str, str, bool], Tuple[str, str, str, Any, int, str, Dict[str, Any], Dict[str, Any]]] = {}
+    defs_get, prin_get = defs.get, prin_map.get
+    # Bucket KPIs/chart are tallied as each row is built, not in a later pass
+    b_counts: Counter = Counter()
 
     def _mk(role_id, pid, start=None, end=None, kind="Active", src=None, eligible=False):
-        rmeta = defs.get(role_id, {})
-        pinfo = prin_map.get(pid, {}) or {}
-        pname = pinfo.get("name") or pid
-        ptype = pinfo.get("type") or "Unknown"
-        rname = rmeta.get("displayName") or role_id
-        risk  = _score_assignment(rname, ptype, eligible)
-        buck  = _bucket_from_risk(risk)
+        key = (role_id, pid, eligible)
+        cached = score_cache.get(key)
+        if cached is None:
+            rmeta = defs_get(role_id) or {}
+            pinfo = prin_get(pid) or {}
+            rname = rmeta.get("displayName") or role_id
+            ptype = pinfo.get("type") or "Unknown"
+            risk  = _score_assignment(rname, ptype, eligible)
+            buck  = _bucket_from_risk(risk)
+            # role/computed sub-dicts are shared by every row with this key
+            cached = score_cache[key] = (
+                pinfo.get("name") or pid, ptype, rname,
+                pinfo.get("raw", {"id": pid}), risk, buck,
+                {"id": role_id, "displayName": rname},
+                {"risk": risk, "bucket": buck},
+            )
+        pname, ptype, rname, praw, risk, buck, role_d, computed_d = cached
+        b_counts[buck] += 1
+
+        if not want_details:
+            return PimRow(pname, ptype, rname, role_id, start or "-", end or "-",
+                          kind, risk, buck, None, None)
 
         # Details dict -> pretty JSON dropdown in report
         details = {
             "source": src or {},
-            "principal": pinfo.get("raw", {"id": pid}),
-            "role": {"id": role_id, "displayName": rname},
+            "principal": praw,
+            "role": role_d,
             "window": {"start": start or None, "end": end or None, "status": kind},
-            "computed": {"risk": risk, "bucket": buck},
+            "computed": computed_d,
         }
 
-        return {
-            "principalName": pname,
-            "principalType": ptype,
-            "roleName": rname,
-            "roleId": role_id,
-            "start": start or "-",
-            "end": end or "-",
-            "status": kind,
-            "risk": risk,
-            "bucket": buck,
-            "Details": details,     # << dropdown-friendly column
-            "source": src or {},    # kept for completeness; hidden in JS
-        }
-
-    for r in perms:
-        perm_rows.append(_mk(r.get("roleDefinitionId"), r.get("principalId"),
-                             kind="Permanent", src=r, eligible=False))
-
-    for r in active:
-        act_rows.append(_mk(r.get("roleDefinitionId"), r.get("principalId"),
-                            start=r.get("startDateTime"), end=r.get("endDateTime"),
-                            kind="Active", src=r, eligible=False))
+        return PimRow(pname, ptype, rname, role_id, start or "-", end or "-",
+                      kind, risk, buck, details, src or {})
 
-    for r in elig:
-        eli_rows.append(_mk(r.get("roleDefinitionId"), r.get("principalId"),
-                            start=r.get("startDateTime"), end=r.get("endDateTime"),
-                            kind="Eligible", src=r, eligible=True))
+    perm_rows: List[PimRow] = [
+        _mk(r.get("roleDefinitionId"), r.get("principalId"),
+            kind="Permanent", src=r, eligible=False)
+        for r in perms
+    ]
+    act_rows: List[PimRow] = [
+        _mk(r.get("roleDefinitionId"), r.get("principalId"),
+            start=r.get("startDateTime"), end=r.get("endDateTime"),
+            kind="Active", src=r, eligible=False)
+        for r in active
+    ]
+    eli_rows: List[PimRow] = [
+        _mk(r.get("roleDefinitionId"), r.get("principalId"),
+            start=r.get("startDateTime"), end=r.get("endDateTime"),
+            kind="Eligible", src=r, eligible=True)
+        for r in elig
+    ]
 
     # Sort by risk desc
-    perm_rows.sort(key=lambda x: x.get("risk",0), reverse=True)
-    act_rows.sort(key=lambda x: x.get("risk",0), reverse=True)
-    eli_rows.sort(key=lambda x: x.get("risk",0), reverse=True)
+    # Every row carries an int risk from _score_assignment
+    by_risk = attrgetter("risk")
+    perm_rows.sort(key=by_risk, reverse=True)
+    act_rows.sort(key=by_risk, reverse=True)
+    eli_rows.sort(key=by_risk, reverse=True)
 
     # Console previews
     if perm_rows:
         fncPrintMessage("Permanent Role Assignments (top 20 by risk)", "info")
-        print(fncToTable(perm_rows[:20], headers=["principalName","principalType","roleName","risk"], max_rows=20))
+        print(fncToTable([r.as_dict() for r in perm_rows[:20]], headers=["principalName","principalType","roleName","risk"], max_rows=20))
     if act_rows:
         fncPrintMessage("PIM Active Assignments (top 20 by risk)", "info")
-        print(fncToTable(act_rows[:20], headers=["principalName","principalType","roleName","start","end","risk"], max_rows=20))
+        print(fncToTable([r.as_dict() for r in act_rows[:20]], headers=["principalName","principalType","roleName","start","end","risk"], max_rows=20))
     if eli_rows:
         fncPrintMessage("PIM Eligible Assignments (top 20 by risk)", "info")
-        print(fncToTable(eli_rows[:20], headers=["principalName","principalType","roleName","start","end","risk"], max_rows=20))
+        print(fncToTable([r.as_dict() for r in eli_rows[:20]], headers=["principalName","principalType","roleName","start","end","risk"], max_rows=20))
 
     # KPIs
     total_perm = len(perm_rows)
     total_active = len(act_rows)
     total_elig = len(eli_rows)
-
-    def _count_crit(rows): return sum(1 for r in rows if r.get("bucket")=="critical")
-    def _count_warn(rows): return sum(1 for r in rows if r.get("bucket")=="warning")
-
-    all_rows = perm_rows + act_rows + eli_rows
+    # Bucket tallies read once; reused by KPIs, chart and summary
+    n_crit, n_warn, n_ok, n_unknown = (b_counts[b] for b in ("critical", "warning", "ok", "unknown"))
 
     kpis = [
         {"label":"Permanent Assignments","value":str(total_perm),"tone":"danger","icon":"bi-shield-lock"},
         {"label":"PIM Active","value":str(total_active),"tone":"warning","icon":"bi-lightning-charge"},
         {"label":"PIM Eligible","value":str(total_elig),"tone":"secondary","icon":"bi-hourglass-split"},
-        {"label":"Critical (All)","value":str(_count_crit(all_rows)),"tone":"danger","icon":"bi-exclamation-octagon"},
-        {"label":"Warning (All)","value":str(_count_warn(all_rows)),"tone":"warning","icon":"bi-exclamation-triangle"},
+        {"label":"Critical (All)","value":str(n_crit),"tone":"danger","icon":"bi-exclamation-octagon"},
+        {"label":"Warning (All)","value":str(n_warn),"tone":"warning","icon":"bi-exclamation-triangle"},
     ]
 
     # Standouts
@@ -628,31 +705,28 @@ def run(client, args):
     if top_perm:
         standouts["group"] = {
             "title":"Highest-Risk Permanent",
-            "name": f"{top_perm['principalName']} → {top_perm['roleName']}",
-            "risk_score": float(min(10.0, top_perm["risk"]/10.0)),
-            "comment": f"{top_perm['principalType']} / {top_perm['bucket'].title()}",
+            "name": f"{top_perm.principalName} → {top_perm.roleName}",
+            "risk_score": float(min(10.0, top_perm.risk/10.0)),
+            "comment": f"{top_perm.principalType} / {top_perm.bucket.title()}",
         }
     if top_active:
         standouts["user"] = {
             "title":"Highest-Risk Active (PIM)",
-            "name": f"{top_active['principalName']} → {top_active['roleName']}",
-            "risk_score": float(min(10.0, top_active["risk"]/10.0)),
-            "comment": f"Active until {top_active['end'] or '-'}",
+            "name": f"{top_active.principalName} → {top_active.roleName}",
+            "risk_score": float(min(10.0, top_active.risk/10.0)),
+            "comment": f"Active until {top_active.end or '-'}",
         }
     if top_elig:
         standouts["computer"] = {
             "title":"Highest-Risk Eligible (PIM)",
-            "name": f"{top_elig['principalName']} → {top_elig['roleName']}",
-            "risk_score": float(min(10.0, top_elig["risk"]/10.0)),
-            "comment": f"Eligible window ends {top_elig['end'] or '-'}",
+            "name": f"{top_elig.principalName} → {top_elig.roleName}",
+            "risk_score": float(min(10.0, top_elig.risk/10.0)),
+            "comment": f"Eligible window ends {top_elig.end or '-'}",
         }
 
     # Chart
-    b_counts = {"critical":0,"warning":0,"ok":0,"unknown":0}
-    for r in all_rows:
-        b_counts[r.get("bucket","unknown")] = b_counts.get(r.get("bucket","unknown"),0)+1
     chart_labels = ["Critical","Warning","OK","Unknown"]
-    chart_values = [b_counts["critical"], b_counts["warning"], b_counts["ok"], b_counts["unknown"]]
+    chart_values = [n_crit, n_warn, n_ok, n_unknown]
 
     data = {
         "provider": "entra",
@@ -662,14 +736,14 @@ def run(client, args):
             "Permanent Assignments": total_perm,
             "PIM Active Assignments": total_active,
             "PIM Eligible Assignments": total_elig,
-            "Critical (All)": _count_crit(all_rows),
-            "Warning (All)": _count_warn(all_rows),
+            "Critical (All)": n_crit,
+            "Warning (All)": n_warn,
         },
 
         # Tables
-        "permanent_assignments": perm_rows,
-        "active_assignments": act_rows,
-        "eligible_assignments": eli_rows,
+        "permanent_assignments": [r.as_dict() for r in perm_rows],
+        "active_assignments": [r.as_dict() for r in act_rows],
+        "eligible_assignments": [r.as_dict() for r in eli_rows],
 
         # Dashboard
         "_kpis": kpis,
@@ -682,8 +756,8 @@ def run(client, args):
         "_title": "PIM Role Audit",
         "_subtitle": "Permanent, Active, and Eligible privileged role assignments",
         "_container_class": "pim-audit",
-        "_inline_css": PIM_CSS,
-        "_inline_js":  PIM_JS,
+        "_inline_css": PIM_CSS_MIN,
+        "_inline_js":  PIM_JS_MIN,
     }
 
     if getattr(args, "html", None):
@@ -14,15 +14,20 @@
 #            retains scoped CSS/JS for table drawers/search.
 # ================================================================
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Tuple
+from itertools import chain, islice
+from operator import itemgetter
+from typing import Callable, Dict, Any, List, Tuple
 
 from core.utils import (
     fncPrintMessage,
     fncNewRunId,
     fncToTable,
+    fncChunkList,
 )
-from core.reporting import fncWriteHTMLReport
+from core.reporting import fncWriteHTMLReport, fncMinifyCSS, fncMinifyJS
 
 
 REQUIRED_PERMS = [
@@ -32,6 +37,12 @@ REQUIRED_PERMS = [
     "RoleManagement.Read.Directory",
 ]
 
+# Per-group Graph calls are latency-bound; 16 workers stays under Graph throttling
+GRAPH_WORKERS = 16
+
+# Members listed per type in a group's Details object (counts still cover all)
+DETAIL_MEMBERS_MAX = 50
+
 # ----------------------- module-local CSS ------------------------
 GROUP_AUDIT_CSS = r"""
 .group-audit .ga-clickable { cursor: pointer; }
@@ -131,6 +142,8 @@ GROUP_AUDIT_JS = r"""
   // ---- helpers ----
   const txt = el => (el?.textContent || '').trim();
   const slug = s => (s||'').toLowerCase().replace(/[^a-z0-9]+/g,'-');
+  const ESC = {'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'};
+  const esc = s => String(s).replace(/[&<>"]/g, c => ESC[c]);
 
   function hideColumns(table, keepSet) {
     // Columns that must NEVER be visible in grid
@@ -169,78 +182,94 @@ GROUP_AUDIT_JS = r"""
 
   function attachRowDrawer(table, options){
     const { idIdx, nameIdx, detailsById, isDetailsTable } = options;
-    const headCells = Array.from(table.querySelectorAll('thead th'));
-    const totalCols = headCells.length;
-
-    Array.from(table.querySelectorAll('tbody tr')).forEach(tr=>{
-      const idCell   = idIdx >= 0 ? tr.children[idIdx] : null;
+    const headers   = Array.from(table.querySelectorAll('thead th')).map(h=>txt(h));
+    const totalCols = headers.length;
+    const tbody     = table.tBodies[0];
+    if (!tbody) return;
+    // Built expander rows, kept per source row so re-opening skips the rebuild
+    const cache = new WeakMap();
+
+    // One innerHTML write per row (label pre-escaped); no per-row listeners
+    Array.from(tbody.rows).forEach(tr=>{
       const nameCell = nameIdx >= 0 ? tr.children[nameIdx] : tr.children[0];
       if (!nameCell) return;
+      nameCell.innerHTML = '<span class="ga-name"><span class="ga-chevron">▸</span><span class="ga-label">'
+                         + esc(txt(nameCell)) + '</span></span>';
+      tr.classList.add('ga-clickable');
+    });
 
-      const label = txt(nameCell);
-      nameCell.innerHTML = `<span class="ga-name"><span class="ga-chevron">▸</span><span class="ga-label"></span></span>`;
-      nameCell.querySelector('.ga-label').textContent = label;
+    tbody.addEventListener('click', e=>{
+      const tr = e.target.closest('tr');
+      if (!tr || tr.parentNode !== tbody || !tr.classList.contains('ga-clickable')) return;
+
+      const idCell = idIdx >= 0 ? tr.children[idIdx] : null;
+      const label  = txt(tr.querySelector('.ga-label'));
+      const gid  = idCell ? txt(idCell) : (isDetailsTable ? txt(tr.children[0]) : '');
+      const open = tr.classList.contains('ga-open');
+      const next = tr.nextElementSibling;
+      if (next && next.classList.contains('ga-expander')) next.remove();  // detached, still cached
+      tr.classList.remove('ga-open');
+      if (open) return;
+
+      let exp = cache.get(tr);
+      if (!exp) {
+        exp = buildExpander(tr, label, gid);
+        cache.set(tr, exp);
+      }
+      tbody.insertBefore(exp, tr.nextSibling);
+      tr.classList.add('ga-open');
 
-      tr.classList.add('ga-clickable');
-      tr.addEventListener('click', ()=>{
-        const gid  = idCell ? txt(idCell) : (isDetailsTable ? txt(tr.children[0]) : '');
-        const open = tr.classList.contains('ga-open');
-        const next = tr.nextElementSibling;
-        if (next && next.classList.contains('ga-expander')) next.remove();
-        tr.classList.remove('ga-open');
-        if (open) return;
-
-        let src = {};
-        if (isDetailsTable) {
-          const headers = Array.from(table.querySelectorAll('thead th')).map(h=>txt(h));
-          const tds = Array.from(tr.children);
-          headers.forEach((name, idx) => src[name] = tds[idx] ? tds[idx].innerHTML : '');
-        } else {
-          src = detailsById.get(gid) || {};
-        }
+      const chev = tr.querySelector('.ga-chevron');
+      if (chev) chev.textContent = '▾';
+    });
+
+    function buildExpander(tr, label, gid){
+      let src = {};
+      if (isDetailsTable) {
+        const tds = tr.children;
+        headers.forEach((name, idx) => src[name] = tds[idx] ? tds[idx].innerHTML : '');
+      } else {
+        src = detailsById.get(gid) || {};
+      }
 
-        const type    = src['Type'] || '';
-        const nUsers  = src['Number of Users'] || '';
-        const nSpns   = src['SPNs'] || '';
-        const nNested = src['Number of Nested Groups'] || '';
-        const details = src['Details'] || '';
-
-        const html = `
-          <div class="ga-expander-body">
-            <div class="ga-flex">
-              <div class="ga-pane">
-                <h5>Overview</h5>
-                <table class="ga-kv"><tbody>
-                  <tr><th>Display Name</th><td>${label}</td></tr>
-                  <tr><th>Id</th><td>${gid || '<em>unknown</em>'}</td></tr>
-                  <tr><th>Type</th><td>${type || '<em>unknown</em>'}</td></tr>
-                  <tr><th>Number of Users</th><td>${nUsers || 0}</td></tr>
-                  <tr><th>SPNs</th><td>${nSpns || 0}</td></tr>
-                  <tr><th>Number of Nested Groups</th><td>${nNested || 0}</td></tr>
-                </tbody></table>
-              </div>
-              <div class="ga-pane">
-                <h5>Details</h5>
-                <table class="ga-kv"><tbody>
-                  <tr><th>Full Object</th><td>${details || '<em>none available</em>'}</td></tr>
-                </tbody></table>
-              </div>
+      const type    = src['Type'] || '';
+      const nUsers  = src['Number of Users'] || '';
+      const nSpns   = src['SPNs'] || '';
+      const nNested = src['Number of Nested Groups'] || '';
+      const details = src['Details'] || '';
+
+      const html = `
+        <div class="ga-expander-body">
+          <div class="ga-flex">
+            <div class="ga-pane">
+              <h5>Overview</h5>
+              <table class="ga-kv"><tbody>
+                <tr><th>Display Name</th><td>${esc(label)}</td></tr>
+                <tr><th>Id</th><td>${gid ? esc(gid) : '<em>unknown</em>'}</td></tr>
+                <tr><th>Type</th><td>${type || '<em>unknown</em>'}</td></tr>
+                <tr><th>Number of Users</th><td>${nUsers || 0}</td></tr>
+                <tr><th>SPNs</th><td>${nSpns || 0}</td></tr>
+                <tr><th>Number of Nested Groups</th><td>${nNested || 0}</td></tr>
+              </tbody></table>
             </div>
-          </div>`;
-
-        const exp = document.createElement('tr');
-        const td  = document.createElement('td');
-        exp.className = 'ga-expander';
-        td.colSpan = totalCols;
-        td.innerHTML = html;
-        exp.appendChild(td);
-        tr.parentNode.insertBefore(exp, tr.nextSibling);
-        tr.classList.add('ga-open');
-
-        const chev = tr.querySelector('.ga-chevron');
-        if (chev) chev.textContent = '▾';
-      });
-    });
+            <div class="ga-pane">
+              <h5>Details</h5>
+              <table class="ga-kv"><tbody>
+                <tr><th>Full Object</th><td>${details || '<em>none available</em>'}</td></tr>
+              </tbody></table>
+            </div>
+          </div>
+        </div>`;
+
+      // Assembled off-document; the caller inserts it in one operation
+      const exp = document.createElement('tr');
+      const td  = document.createElement('td');
+      exp.className = 'ga-expander';
+      td.colSpan = totalCols;
+      td.innerHTML = html;
+      exp.appendChild(td);
+      return exp;
+    }
   }
 
   function addToolbar(table, title){
@@ -267,16 +296,16 @@ GROUP_AUDIT_JS = r"""
 
     function apply(){
       const q = (search.value||'').toLowerCase();
-      let shown = 0;
-      rows.forEach((tr, idx)=>{
+      // One pass: pagination state is tracked here rather than re-scanned after
+      let shown = 0, paginated = false;
+      rows.forEach(tr=>{
         const match = !q || tr.textContent.toLowerCase().includes(q);
         if (!match) { tr.style.display = 'none'; return; }
-        if (!expanded && q === '' && shown >= PAGE) { tr.style.display = 'none'; return; }
+        if (!expanded && q === '' && shown >= PAGE) { tr.style.display = 'none'; paginated = true; return; }
         tr.style.display = '';
         shown++;
       });
-      const moreExists = rows.filter(tr => tr.style.display !== 'none').length < rows.length && q === '' && !expanded;
-      viewMoreBtn.style.display = moreExists ? '' : 'none';
+      viewMoreBtn.style.display = (paginated && q === '') ? '' : 'none';
     }
 
     apply();
@@ -324,6 +353,10 @@ GROUP_AUDIT_JS = r"""
 })();
 """
 
+# ------------------- minified copies (built once) -------------------
+GROUP_AUDIT_CSS_MIN = fncMinifyCSS(GROUP_AUDIT_CSS)
+GROUP_AUDIT_JS_MIN  = fncMinifyJS(GROUP_AUDIT_JS)
+
 # ----------------------- helpers & scoring -----------------------
 
 ROLE_WARN_THRESHOLDS: Dict[str, int] = {
@@ -343,6 +376,62 @@ def _safe_get(obj: Dict, *path, default=None):
         cur = cur[k]
     return cur
 
+# Directory object categories, looked up by exact @odata.type; unseen
+# types are classified once by suffix and memoised
+CAT_USER, CAT_GROUP, CAT_SP, CAT_OTHER = 0, 1, 2, 3
+_CAT: Dict[str, int] = {
+    "#microsoft.graph.user": CAT_USER,
+    "#microsoft.graph.group": CAT_GROUP,
+    "#microsoft.graph.servicePrincipal": CAT_SP,
+}
+
+def _categorize(o: Dict[str, Any]) -> int:
+    t = o.get("@odata.type") or ""
+    cat = _CAT.get(t)
+    if cat is None:
+        tl = t.lower()
+        if tl.endswith("user"):
+            cat = CAT_USER
+        elif tl.endswith("group"):
+            cat = CAT_GROUP
+        elif tl.endswith("serviceprincipal"):
+            cat = CAT_SP
+        else:
+            cat = CAT_OTHER
+        _CAT[t] = cat
+    return cat
+
+def _split_by_category(objs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], ...]:
+    """One pass over objs -> (users, groups, sps, other)."""
+    out: Tuple[List[Dict[str, Any]], ...] = ([], [], [], [])
+    for o in objs:
+        out[_categorize(o)].append(o)
+    return out
+
+# Shared stand-in for principals that were not hydrated (never mutated)
+_EMPTY: Dict[str, Any] = {}
+
+def _user_brief(uid: str, users_by_id: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    rec = users_by_id.get(uid) or _EMPTY
+    return {
+        "userPrincipalName": rec.get("userPrincipalName", ""),
+        "userType": rec.get("userType", ""),
+        "onPremisesSyncEnabled": rec.get("onPremisesSyncEnabled"),
+        "accountEnabled": rec.get("accountEnabled"),
+    }
+
+def _sp_brief(sid: str, sps_by_id: Dict[str, Dict[str, Any]],
+              with_enabled: bool = False) -> Dict[str, Any]:
+    rec = sps_by_id.get(sid) or _EMPTY
+    out = {
+        "displayName": rec.get("displayName", ""),
+        "type": rec.get("servicePrincipalType", ""),
+        "publisherName": rec.get("publisherName", ""),
+    }
+    if with_enabled:
+        out["accountEnabled"] = rec.get("accountEnabled")
+    return out
+
 def _group_type(g: Dict[str, Any]) -> str:
     gtypes = g.get("groupTypes") or []
     if "Unified" in gtypes:
@@ -363,19 +452,21 @@ def _bucket_from_risk(risk: int) -> str:
     return "ok"
 
 def _impact_likelihood_row(g: Dict[str, Any], counts: Dict[str, int]) -> Dict[str, int]:
-    impact = 0
-    if g.get("securityEnabled"): impact += 2
-    if g.get("isAssignableToRole"): impact += 10
-    if counts.get("appRoles"): impact += 3
-    if counts.get("roleAssignments"): impact += 6
-
-    likelihood = 0
-    if counts.get("users", 0) > 0:  likelihood += 2
-    if counts.get("guests", 0) > 0: likelihood += 2
-    if counts.get("groups", 0) > 0: likelihood += 2
-    if counts.get("sps", 0) > 0:    likelihood += 2
-
-    risk = int(impact * max(1, likelihood))
+    # Straight-line weighted sums of 0/1 flags (bool is an int); no branches
+    impact = (
+        2  * bool(g.get("securityEnabled"))
+        + 10 * bool(g.get("isAssignableToRole"))
+        + 3  * bool(counts.get("appRoles"))
+        + 6  * bool(counts.get("roleAssignments"))
+    )
+    likelihood = 2 * (
+        (counts.get("users", 0) > 0)
+        + (counts.get("guests", 0) > 0)
+        + (counts.get("groups", 0) > 0)
+        + (counts.get("sps", 0) > 0)
+    )
+
+    risk = impact * max(1, likelihood)
     return {"impact": impact, "likelihood": likelihood, "risk": risk}
 
 # --------------------- Graph helpers (v1.0-safe) ---------------------
@@ -388,67 +479,148 @@ def _get_groups(client) -> List[Dict[str, Any]]:
     )
     return client.get_all(url)
 
-def _get_ids(urls: List[str], client) -> Dict[str, List[Dict[str, Any]]]:
+def _graph_batch(client, urls: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    GET many relative URLs through Graph $batch (20 per call), re-batching
+    @odata.nextLink continuations until every collection is drained.
+    Returns rows keyed like `urls`; ids whose sub-request failed (or all ids,
+    if the batch call itself fails) are left out so callers can fall back.
+    """
+    if not urls or not hasattr(client, "batch"):
+        return {}
     out: Dict[str, List[Dict[str, Any]]] = {}
-    for u in urls:
-        parts = u.split("/")
-        group_id = parts[1] if len(parts) > 1 else ""
+    pending = dict(urls)
+    while pending:
+        try:
+            resp = client.batch([
+                # $batch URLs are not encoded for us, so escape spaces in filters
+                {"id": key, "method": "GET", "url": "/" + u.replace(" ", "%20")}
+                for key, u in pending.items()
+            ])
+        except Exception as ex:
+            fncPrintMessage(f"Batch fetch failed ({ex}); falling back to direct requests.", "debug")
+            for key in pending:
+                out.pop(key, None)
+            return out
+        continuations: Dict[str, str] = {}
+        for key in pending:
+            sub = resp.get(key) or {}
+            if sub.get("status") != 200:
+                out.pop(key, None)
+                continue
+            body = sub.get("body") or {}
+            out.setdefault(key, []).extend(body.get("value") or [])
+            link = body.get("@odata.nextLink")
+            if link:
+                # nextLinks are absolute; $batch wants them relative to the version root
+                continuations[key] = link.split("/v1.0/", 1)[-1]
+        pending = continuations
+    return out
+
+def _group_id_from_url(u: str) -> str:
+    parts = u.split("/")
+    return parts[1] if len(parts) > 1 else ""
+
+def _get_ids(urls: List[str], client) -> Dict[str, List[Dict[str, Any]]]:
+    def _fetch_one(u: str) -> Tuple[str, List[Dict[str, Any]]]:
+        group_id = _group_id_from_url(u)
         try:
             rows = client.get_all(u + "?$select=id")
             if any("@odata.type" not in r for r in rows):
                 rows = client.get_all(u)
-            out[group_id] = rows
+            return group_id, rows
         except Exception as ex:
             fncPrintMessage(f"Failed to list {u}: {ex}", "warn")
-            out[group_id] = []
+            return group_id, []
+
+    if not urls:
+        return {}
+    by_gid = {_group_id_from_url(u): u for u in urls}
+    batched = _graph_batch(client, {gid: u + "?$select=id" for gid, u in by_gid.items()})
+    out = {gid: rows for gid, rows in batched.items()
+           if all("@odata.type" in r for r in rows)}
+
+    # Anything the batch could not answer goes through direct, concurrent GETs
+    rest = [u for gid, u in by_gid.items() if gid not in out]
+    if rest:
+        with ThreadPoolExecutor(max_workers=min(GRAPH_WORKERS, len(rest))) as executor:
+            out.update(executor.map(_fetch_one, rest))
     return out
 
-def _batch_get_users(client, ids: List[str]) -> Dict[str, Dict[str, Any]]:
-    out: Dict[str, Dict[str, Any]] = {}
-    if not ids:
-        return out
-    for chunk in [ids[i:i+20] for i in range(0, len(ids), 20)]:
-        flt = " or ".join([f"id eq '{i}'" for i in chunk])
-        rows = client.get_all(
-            "users?$select=id,userType,accountEnabled,onPremisesSyncEnabled,userPrincipalName"
-            f"&$filter={flt}"
-        )
-        for r in rows:
-            out[r["id"]] = r
+def _get_per_group(client, group_ids: List[str],
+                   url_for: Callable[[str], str],
+                   fetch: Callable[[Any, str], List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    if not group_ids:
+        return {}
+    out = _graph_batch(client, {gid: url_for(gid) for gid in group_ids})
+    rest = [gid for gid in group_ids if gid not in out]
+    if rest:
+        # fetch() already logs and swallows its own errors, so map() never raises here
+        with ThreadPoolExecutor(max_workers=min(GRAPH_WORKERS, len(rest))) as executor:
+            out.update(zip(rest, executor.map(lambda gid: fetch(client, gid), rest)))
     return out
 
-def _batch_get_sps(client, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+# getByIds takes up to 1000 ids per POST; the $filter fallback only fits ~20
+GET_BY_IDS_MAX = 1000
+FILTER_IDS_MAX = 20
+
+_USER_SELECT = "id,userType,accountEnabled,onPremisesSyncEnabled,userPrincipalName"
+_SP_SELECT   = "id,displayName,servicePrincipalType,publisherName,appOwnerOrganizationId,accountEnabled"
+
+def _get_by_ids(client, ids: List[str], graph_type: str, collection: str,
+                select: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Hydrate directory objects of one type via POST directoryObjects/getByIds.
+    Falls back to chunked `id eq ... or ...` filters on the collection if the
+    POST is rejected (e.g. a client without post_json).
+    """
     out: Dict[str, Dict[str, Any]] = {}
     if not ids:
         return out
-    for chunk in [ids[i:i+20] for i in range(0, len(ids), 20)]:
+    try:
+        for chunk in fncChunkList(ids, GET_BY_IDS_MAX):
+            data = client.post_json(
+                f"directoryObjects/getByIds?$select={select}",
+                {"ids": list(chunk), "types": [graph_type]},
+            )
+            for r in data.get("value") or []:
+                out[r["id"]] = r
+        return out
+    except Exception as ex:
+        fncPrintMessage(f"getByIds failed for {collection} ({ex}); using filtered GETs.", "debug")
+
+    for chunk in fncChunkList(ids, FILTER_IDS_MAX):
         flt = " or ".join([f"id eq '{i}'" for i in chunk])
-        rows = client.get_all(
-            "servicePrincipals?"
-            "$select=id,displayName,servicePrincipalType,publisherName,appOwnerOrganizationId,accountEnabled"
-            f"&$filter={flt}"
-        )
-        for r in rows:
+        for r in client.get_all(f"{collection}?$select={select}&$filter={flt}"):
             out[r["id"]] = r
     return out
 
-def _get_grouprole_assignments(client, group_id: str) -> List[Dict[str, Any]]:
-    url = (
+def _batch_get_users(client, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    return _get_by_ids(client, ids, "user", "users", _USER_SELECT)
+
+def _batch_get_sps(client, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    return _get_by_ids(client, ids, "servicePrincipal", "servicePrincipals", _SP_SELECT)
+
+def _grouprole_assignments_url(group_id: str) -> str:
+    return (
         "roleManagement/directory/roleAssignments?"
         f"$filter=principalId eq '{group_id}'"
         "&$expand=roleDefinition($select=displayName)"
     )
+
+def _group_approles_url(group_id: str) -> str:
+    return f"groups/{group_id}/appRoleAssignments?$select=resourceDisplayName,resourceId,appRoleId"
+
+def _get_grouprole_assignments(client, group_id: str) -> List[Dict[str, Any]]:
     try:
-        return client.get_all(url)
+        return client.get_all(_grouprole_assignments_url(group_id))
     except Exception as ex:
         fncPrintMessage(f"Role assignments fetch failed (group {group_id}): {ex}", "warn")
         return []
 
 def _get_group_approles(client, group_id: str) -> List[Dict[str, Any]]:
     try:
-        return client.get_all(
-            f"groups/{group_id}/appRoleAssignments?$select=resourceDisplayName,resourceId,appRoleId"
-        )
+        return client.get_all(_group_approles_url(group_id))
     except Exception as ex:
         fncPrintMessage(f"App role assignments fetch failed (group {group_id}): {ex}", "warn")
         return []
@@ -463,6 +635,10 @@ def _get_all_directory_role_assignments(client) -> List[Dict[str, Any]]:
     )
     return client.get_all(url)
 
+def _builtin_role_sort_key(r: Dict[str, Any]) -> Tuple[bool, int]:
+    # Global Administrator first, then most assignees; Assignees is always an int here
+    return (r["Role"] != "Global Administrator", -r["Assignees"])
+
 def _summarise_built_in_roles(assignments: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
     by_def: Dict[str, Dict[str, Any]] = {}
     for a in assignments:
@@ -499,17 +675,14 @@ def _summarise_built_in_roles(assignments: List[Dict[str, Any]]) -> Tuple[List[D
             "Warning": warn_txt or "-",
         })
 
-    def sort_key(r):
-        pri = 0 if r["Role"] == "Global Administrator" else 1
-        return (pri, -int(r["Assignees"]))
-    rows.sort(key=sort_key)
+    rows.sort(key=_builtin_role_sort_key)
     return rows, warnings
 
 # --------------------- Module entry point -----------------------
 
 def run(client, args):
     run_id = fncNewRunId("groups")
-    ts = datetime.now(timezone.utc).isoformat()
+    ts = _iso_now()  # one timestamp for the whole run
     fncPrintMessage("Starting module: entra/group_audit", "info")
     fncPrintMessage(f"Running Group Audit (run={run_id})", "info")
 
@@ -521,73 +694,68 @@ def run(client, args):
     members_map = _get_ids(member_urls, client)
     owners_map  = _get_ids(owner_urls, client)
 
-    # Collect users/SP ids
-    all_member_user_ids, all_owner_user_ids = [], []
-    all_member_sp_ids,   all_owner_sp_ids   = [], []
+    # Categorise every member/owner once: gid -> (users, groups, sps, other)
+    no_split = ([], [], [], [])
+    members_split = {gid: _split_by_category(rows) for gid, rows in members_map.items()}
+    owners_split  = {gid: _split_by_category(rows) for gid, rows in owners_map.items()}
+
+    # Collect users/SP ids (members and owners together), deduped once
+    user_ids: Dict[str, None] = {}
+    sp_ids:   Dict[str, None] = {}
 
     for g in groups:
         gid = g["id"]
-        for o in members_map.get(gid, []):
-            t = (o.get("@odata.type") or "").lower()
-            if t.endswith("user"):
-                all_member_user_ids.append(o["id"])
-            elif t.endswith("serviceprincipal"):
-                all_member_sp_ids.append(o["id"])
-        for o in owners_map.get(gid, []):
-            t = (o.get("@odata.type") or "").lower()
-            if t.endswith("user"):
-                all_owner_user_ids.append(o["id"])
-            elif t.endswith("serviceprincipal"):
-                all_owner_sp_ids.append(o["id"])
-
-    # Dedup & hydrate
-    all_member_user_ids = list(dict.fromkeys(all_member_user_ids))
-    all_owner_user_ids  = list(dict.fromkeys(all_owner_user_ids))
-    all_member_sp_ids   = list(dict.fromkeys(all_member_sp_ids))
-    all_owner_sp_ids    = list(dict.fromkeys(all_owner_sp_ids))
-
-    users_by_id = _batch_get_users(client, list(set(all_member_user_ids + all_owner_user_ids)))
-    sps_by_id   = _batch_get_sps(client,   list(set(all_member_sp_ids   + all_owner_sp_ids)))
+        m_users, _, m_sps, _ = members_split.get(gid, no_split)
+        o_users, _, o_sps, _ = owners_split.get(gid, no_split)
+        for o in chain(m_users, o_users):
+            user_ids[o["id"]] = None
+        for o in chain(m_sps, o_sps):
+            sp_ids[o["id"]] = None
+
+    # Hydrate
+    users_by_id = _batch_get_users(client, list(user_ids))
+    sps_by_id   = _batch_get_sps(client,   list(sp_ids))
+
+    # Per-group app role / directory role lookups ($batch, concurrent GETs as fallback)
+    group_ids       = [g["id"] for g in groups]
+    approles_by_gid = _get_per_group(client, group_ids, _group_approles_url, _get_group_approles)
+    roles_by_gid    = _get_per_group(client, group_ids, _grouprole_assignments_url,
+                                     _get_grouprole_assignments)
 
     overview_rows: List[Dict[str, Any]] = []
     detail_rows:   List[Dict[str, Any]] = []
 
-    # Aggregates for dashboard
-    bucket_counts = {"critical":0, "warning":0, "ok":0, "unknown":0}
-    with_roles = 0
-    with_approles = 0
-    with_guests = 0
-    dynamic_groups = 0
+    # Compact per-group facts for the dashboard, aggregated after the loop:
+    # (name, risk, bucket, roleAssignments, appRoles, guests, dynamic)
+    summary_rows: List[Tuple[str, int, str, int, int, int, bool]] = []
 
     name_by_id = {g["id"]: g.get("displayName", "") for g in groups}
-    top_risky = None
-    top_roles = None
-    top_approles = None
 
     for g in groups:
         gid = g["id"]
-        mem = members_map.get(gid, [])
-        own = owners_map.get(gid,  [])
+        mem_users, mem_groups, mem_sps, _ = members_split.get(gid, no_split)
+        own_users, _, own_sps, _          = owners_split.get(gid, no_split)
 
-        mem_users  = [m for m in mem if (m.get("@odata.type","").lower().endswith("user"))]
-        mem_groups = [m for m in mem if (m.get("@odata.type","").lower().endswith("group"))]
-        mem_sps    = [m for m in mem if (m.get("@odata.type","").lower().endswith("serviceprincipal"))]
+        # Per-group attributes read once and reused by every row below
+        gtypes     = g.get("groupTypes") or []
+        gtype_str  = _group_type(g)
+        is_dynamic = "DynamicMembership" in gtypes
+        dname      = g.get("displayName", "")
+        label      = g.get("displayName", "(unnamed)")
+        vis        = g.get("visibility") or "Private"
 
-        own_users = [o for o in own if (o.get("@odata.type","").lower().endswith("user"))]
-        own_sps   = [o for o in own if (o.get("@odata.type","").lower().endswith("serviceprincipal"))]
-
-        approles = _get_group_approles(client, gid)
-        roles    = _get_grouprole_assignments(client, gid)
+        approles = approles_by_gid.get(gid, [])
+        roles    = roles_by_gid.get(gid, [])
 
         role_names = sorted(
-            { _safe_get(r, "roleDefinition", "displayName") for r in roles if _safe_get(r, "roleDefinition", "displayName") }
+            {n for r in roles if (n := (r.get("roleDefinition") or _EMPTY).get("displayName"))}
         )
         role_assignable_display = ", ".join(role_names) if role_names else "No Role Assignable"
 
         n_users   = len(mem_users)
         n_groups  = len(mem_groups)
         n_spns    = len(mem_sps)
-        n_guests  = sum(1 for u in mem_users if (users_by_id.get(u["id"], {}).get("userType") == "Guest"))
+        n_guests  = sum(1 for u in mem_users if (users_by_id.get(u["id"]) or _EMPTY).get("userType") == "Guest")
 
         counts = {
             "users": n_users,
@@ -600,72 +768,42 @@ def run(client, args):
 
         score = _impact_likelihood_row(g, counts)
         bucket = _bucket_from_risk(score["risk"])
-        bucket_counts[bucket] = bucket_counts.get(bucket, 0) + 1
-        if counts["roleAssignments"] > 0: with_roles += 1
-        if counts["appRoles"] > 0: with_approles += 1
-        if n_guests > 0: with_guests += 1
-        if "DynamicMembership" in (g.get("groupTypes") or []): dynamic_groups += 1
-
-        # track standouts
-        if (top_risky is None) or (score["risk"] > top_risky["risk"]):
-            top_risky = {"name": g.get("displayName","(unnamed)"), "risk": score["risk"], "bucket": bucket}
-        if (top_roles is None) or (counts["roleAssignments"] > top_roles["count"]):
-            top_roles = {"name": g.get("displayName","(unnamed)"), "count": counts["roleAssignments"]}
-        if (top_approles is None) or (counts["appRoles"] > top_approles["count"]):
-            top_approles = {"name": g.get("displayName","(unnamed)"), "count": counts["appRoles"]}
+        summary_rows.append((label, score["risk"], bucket, counts["roleAssignments"],
+                             counts["appRoles"], n_guests, is_dynamic))
 
         # ---- Overview (slim) ----
         overview_rows.append({
             "Id": gid,
-            "DisplayName": g.get("displayName",""),
-            "Type": _group_type(g),
-            "Visibility": g.get("visibility") or "Private",
+            "DisplayName": dname,
+            "Type": gtype_str,
+            "Visibility": vis,
             "Risk": score["risk"],
         })
 
         # ---- Details table with requested headers + a full Details object ----
         full_details = {
             "General": {
-                "Type": _group_type(g),
-                "Visibility": g.get("visibility") or "Private",
+                "Type": gtype_str,
+                "Visibility": vis,
                 "SecurityEnabled": bool(g.get("securityEnabled", False)),
                 "RoleAssignable": role_assignable_display,
                 "OnPrem": bool(g.get("onPremisesSyncEnabled", False)),
-                "Dynamic": ("DynamicMembership" in (g.get("groupTypes") or [])),
+                "Dynamic": is_dynamic,
                 "Description": g.get("description",""),
                 "MembershipRule": g.get("membershipRule",""),
             },
             "Owners (Users)": [
-                {
-                    "userPrincipalName": users_by_id.get(u["id"],{}).get("userPrincipalName",""),
-                    "userType": users_by_id.get(u["id"],{}).get("userType",""),
-                    "onPremisesSyncEnabled": users_by_id.get(u["id"],{}).get("onPremisesSyncEnabled", None),
-                    "accountEnabled": users_by_id.get(u["id"],{}).get("accountEnabled", None),
-                } for u in own_users
+                _user_brief(u["id"], users_by_id) for u in own_users
             ],
             "Owners (Service Principals)": [
-                {
-                    "displayName": sps_by_id.get(s["id"],{}).get("displayName",""),
-                    "type": sps_by_id.get(s["id"],{}).get("servicePrincipalType",""),
-                    "publisherName": sps_by_id.get(s["id"],{}).get("publisherName",""),
-                    "accountEnabled": sps_by_id.get(s["id"],{}).get("accountEnabled", None),
-                } for s in own_sps
+                _sp_brief(s["id"], sps_by_id, with_enabled=True) for s in own_sps
             ],
             "Members (Users)": [
-                {
-                    "userPrincipalName": users_by_id.get(u["id"],{}).get("userPrincipalName",""),
-                    "userType": users_by_id.get(u["id"],{}).get("userType",""),
-                    "onPremisesSyncEnabled": users_by_id.get(u["id"],{}).get("onPremisesSyncEnabled", None),
-                    "accountEnabled": users_by_id.get(u["id"],{}).get("accountEnabled", None),
-                } for u in mem_users[:50]
+                _user_brief(u["id"], users_by_id) for u in islice(mem_users, DETAIL_MEMBERS_MAX)
             ],
-            "Members (Groups)": [ {"id": x["id"]} for x in mem_groups[:50] ],
+            "Members (Groups)": [ {"id": x["id"]} for x in islice(mem_groups, DETAIL_MEMBERS_MAX) ],
             "Members (Service Principals)": [
-                {
-                    "displayName": sps_by_id.get(s["id"],{}).get("displayName",""),
-                    "type": sps_by_id.get(s["id"],{}).get("servicePrincipalType",""),
-                    "publisherName": sps_by_id.get(s["id"],{}).get("publisherName",""),
-                } for s in mem_sps[:50]
+                _sp_brief(s["id"], sps_by_id) for s in islice(mem_sps, DETAIL_MEMBERS_MAX)
             ],
             "AppRoles": [
                 {"resource": a.get("resourceDisplayName",""), "appRoleId": a.get("appRoleId","")}
@@ -673,7 +811,7 @@ def run(client, args):
             ],
             "DirectoryRoleAssignments": [
                 {
-                    "displayName": _safe_get(r, "roleDefinition", "displayName"),
+                    "displayName": (r.get("roleDefinition") or _EMPTY).get("displayName"),
                     "directoryScopeId": r.get("directoryScopeId"),
                     "principalId": r.get("principalId"),
                 } for r in roles
@@ -689,14 +827,32 @@ def run(client, args):
 
         detail_rows.append({
             "Id": gid,
-            "Display Name": g.get("displayName",""),
-            "Type": _group_type(g),
+            "Display Name": dname,
+            "Type": gtype_str,
             "Number of Users": n_users,
             "SPNs": n_spns,
             "Number of Nested Groups": n_groups,
             "Details": full_details,
         })
 
+    # Dashboard aggregates in one post-pass (max() keeps the first of ties,
+    # matching the old strict '>' tracking)
+    bucket_counts  = {"critical":0, "warning":0, "ok":0, "unknown":0}
+    bucket_counts.update(Counter(row[2] for row in summary_rows))
+    with_roles     = sum(1 for row in summary_rows if row[3] > 0)
+    with_approles  = sum(1 for row in summary_rows if row[4] > 0)
+    with_guests    = sum(1 for row in summary_rows if row[5] > 0)
+    dynamic_groups = sum(1 for row in summary_rows if row[6])
+
+    top_risky = top_roles = top_approles = None
+    if summary_rows:
+        row = max(summary_rows, key=itemgetter(1))
+        top_risky = {"name": row[0], "risk": row[1], "bucket": row[2]}
+        row = max(summary_rows, key=itemgetter(3))
+        top_roles = {"name": row[0], "count": row[3]}
+        row = max(summary_rows, key=itemgetter(4))
+        top_approles = {"name": row[0], "count": row[4]}
+
     # Sort overview by risk desc
     overview_rows.sort(key=lambda r: r["Risk"], reverse=True)
 
@@ -713,7 +869,7 @@ def run(client, args):
         fncPrintMessage("[•] Direct nested groups (one level)", "info")
         for g in groups:
             gid = g["id"]
-            mem_groups = [m for m in members_map.get(gid, []) if (m.get("@odata.type","").lower().endswith("group"))]
+            mem_groups = members_split.get(gid, no_split)[CAT_GROUP]
             if not mem_groups:
                 continue
             print(name_by_id.get(gid, gid))
@@ -805,8 +961,8 @@ def run(client, args):
         },
 
         # ===== Keep scoped styling/behaviour for tables =====
-        "_inline_css": GROUP_AUDIT_CSS,
-        "_inline_js":  GROUP_AUDIT_JS,
+        "_inline_css": GROUP_AUDIT_CSS_MIN,
+        "_inline_js":  GROUP_AUDIT_JS_MIN,
         "_container_class": "group-audit",
         "_title": "Entra Group Audit",
         "_subtitle": "Overview, details, and built-in role exposure",